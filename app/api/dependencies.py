@@ -6,7 +6,7 @@ from jose import JWTError, jwt
 from app.db.database import get_db
 from app.core.config import settings
 from app.core import security
-from app.models import user as user_model
+from app.core import auth_cache
 from app.schemas import token as token_schema
 from app.crud import crud_user
 
@@ -14,31 +14,62 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> user_model.User:
+) -> auth_cache.UserSnapshot:
+    """
+    Valida el token y devuelve el usuario como UserSnapshot (id, email,
+    is_active), con o sin caché: las rutas no dependen de la sesión SQL ni de
+    relaciones del modelo, y se comportan igual con AUTH_CACHE_ENABLED.
+    Con la caché, los tokens ya verificados y los usuarios se sirven desde
+    auth_cache.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
+    use_cache = settings.AUTH_CACHE_ENABLED
+
+    email = auth_cache.token_cache.get(token) if use_cache else None
+    if email is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+            token_data = token_schema.TokenData(email=email)
+        except JWTError:
             raise credentials_exception
-        token_data = token_schema.TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    
-    user = crud_user.get_user_by_email(db, email=token_data.email)
+        email = token_data.email
+        if use_cache and payload.get("exp") is not None:
+            auth_cache.token_cache.put(token, email, float(payload["exp"]))
+
+    if use_cache:
+        cached_user = auth_cache.user_cache.get(email)
+        if cached_user is not None:
+            return cached_user
+
+    user = crud_user.get_user_by_email(db, email=email)
     if user is None:
         raise credentials_exception
-    return user
+    snapshot = auth_cache.UserSnapshot.from_user(user)
+    if use_cache:
+        auth_cache.user_cache.put(snapshot)
+    return snapshot
 
 def get_current_active_user(
-    current_user: user_model.User = Depends(get_current_user),
-) -> user_model.User:
+    current_user: auth_cache.UserSnapshot = Depends(get_current_user),
+) -> auth_cache.UserSnapshot:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+def get_current_admin_user(
+    db: Session = Depends(get_db),
+    current_user: auth_cache.UserSnapshot = Depends(get_current_active_user),
+) -> auth_cache.UserSnapshot:
+    """ Usuario activo con rol admin en alguna empresa (rutas de diagnóstico) """
+    if not crud_user.is_admin(db, current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return current_user
@@ -0,0 +1,50 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import List
+
+from app.api.dependencies import get_current_admin_user
+from app.core.loop_monitor import loop_monitor
+from app.db import slow_queries
+from app.core.auth_cache import UserSnapshot
+from app.core.config import settings
+from app.core.profiling import report_path
+from app.schemas import admin as admin_schema
+
+router = APIRouter()
+
+
+@router.get("/admin/slow-queries", response_model=List[admin_schema.SlowQueryRecord])
+def read_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    """
+    Últimas consultas a Mongo que superaron MONGO_SLOW_QUERY_MS (más recientes primero).
+    """
+    return list(reversed(slow_queries.recent))[:limit]
+
+
+@router.get("/admin/loop-blocks", response_model=List[admin_schema.LoopBlockRecord])
+def read_loop_blocks(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    """
+    Stacks capturados cuando el event loop estuvo bloqueado más de
+    LOOP_BLOCK_THRESHOLD_MS (solo con LOOP_BLOCK_DEBUG; más recientes primero).
+    """
+    return list(reversed(loop_monitor.blocks))[:limit]
+
+
+@router.get("/admin/profiles/{report_id}", response_class=FileResponse)
+def read_profile_report(
+    report_id: str,
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    """ Reporte HTML de pyinstrument cuyo id vino en X-Profile-Report """
+    path = report_path(settings.PROFILE_OUTPUT_DIR, report_id) if settings.PROFILE_OUTPUT_DIR else None
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Reporte no encontrado")
+    return FileResponse(path, media_type="text/html")
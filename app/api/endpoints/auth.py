@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.crud import crud_user
@@ -7,21 +8,39 @@ from app.core import security
 from app.schemas import token as token_schema
 from app.schemas.token import AccessTokenResponse
 from app.api.dependencies import get_current_active_user
-from app.models import user as user_model # <--- ¡Importante!
+from app.core.auth_cache import UserSnapshot
 from pydantic import BaseModel
 router = APIRouter()
 
 @router.post("/token", response_model=token_schema.Token)
-def login_for_access_token(
+async def login_for_access_token(
     db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = crud_user.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    # bcrypt corre en su propio pool (security.password_pool), no en el
+    # threadpool que atiende al resto de las rutas sync
+    user = await run_in_threadpool(crud_user.get_user_by_email, db, email=form_data.username)
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await security.verify_and_update_password(
+                form_data.password, user.hashed_password
+            )
+        except security.PasswordPoolBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Demasiados inicios de sesión simultáneos, reintente en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+    if not user or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Hash con costo desactualizado: se reemplaza de forma transparente
+        await run_in_threadpool(crud_user.update_password_hash, db, user, new_hash)
+
     token_data = {"sub": user.email}
     
     access_token = security.create_access_token(data=token_data)
@@ -34,7 +53,7 @@ def login_for_access_token(
     }
 @router.post("/token/refresh", response_model=AccessTokenResponse)
 def refresh_access_token(
-    current_user: user_model.User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     new_access_token = security.create_access_token(
         data={"sub": current_user.email}
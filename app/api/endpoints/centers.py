@@ -19,6 +19,27 @@ def create_center(
     return crud_user.create_center(db=db, center_data=center)
 
 
+@router.post("/centers/bulk", response_model=List[center_schema.Center], status_code=status.HTTP_201_CREATED)
+def create_centers_bulk(
+    centers: List[center_schema.CenterCreate],
+    db: Session = Depends(get_db)
+):
+    """
+    Crea varios centros en una sola transacción.
+    Valida todas las compañías con una consulta; si alguna no existe
+    no se crea ningún centro.
+    """
+    if not centers:
+        return []
+
+    company_ids = {c.company_id for c in centers}
+    missing_companies = sorted(company_ids - crud_user.get_existing_company_ids(db, company_ids))
+    if missing_companies:
+        raise HTTPException(status_code=404, detail=f"Companies not found. Cannot create centers: {missing_companies}")
+
+    return crud_user.bulk_create_centers(db=db, centers_data=centers)
+
+
 @router.get("/companies/{company_id}/centers", response_model=List[center_schema.Center])
 def read_centers_for_company(
     company_id: int,
@@ -1,23 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from motor.motor_asyncio import AsyncIOMotorCollection
 
+import asyncio
+import csv
 import datetime
+import io
+import logging
 import pymongo 
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from app.db.database import get_db
-from app.db import mongodb
+from app.db import mongodb, slow_queries
 
 from app.db.mongodb import db_energy, db_fuel
 from app.crud import crud_device, crud_user
 from app.schemas import device as device_schema
-from app.models import user as user_model, device as device_model
+from app.models import device as device_model
+from app.core.auth_cache import UserSnapshot
 from app.api.dependencies import get_current_active_user
 from app.core.config import settings
+from app.core.time_buckets import (
+    bucket_count,
+    bucket_floor,
+    bucket_label,
+    choose_bucket,
+    date_trunc_expr,
+    parse_bucket_label,
+)
+from app.core import history_export
+from app.core.pagination import decode_cursor, decode_id_cursor, parse_since, set_next_cursor, set_sync_cursor, sync_horizon
+from app.core.history_export import ExportFormat
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Campos de 'object' que se agregan (Min/Max) en los historiales, por tipo
+HISTORY_FIELDS = {
+    "combustible": ["volume_L_S0", "volume_L_S1", "pressure_Bar_S0"],
+    "energia": ["agg_activePower", "agg_voltage", "agg_current"],
+}
+
+# Límite de buckets cuando la resolución se pide explícitamente
+MAX_HISTORY_BUCKETS = 5000
+
+# Máximo de filas por carga masiva de dispositivos
+MAX_BULK_DEVICES = 10000
+
 @router.post("/devices", response_model=device_schema.Device, status_code=status.HTTP_201_CREATED)
 def create_device(
     device: device_schema.DeviceCreate,
@@ -33,20 +66,256 @@ def create_device(
     return crud_device.create_device(db=db, device_data=device)
 
 
+def _provision_devices(db: Session, rows: List[Any]) -> device_schema.DeviceBulkResponse:
+    """
+    Valida todas las filas (EUIs y centros con 2 consultas en total) e inserta
+    las válidas en una sola transacción. Las filas inválidas no frenan al resto.
+    """
+    if len(rows) > MAX_BULK_DEVICES:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_BULK_DEVICES} dispositivos por carga")
+
+    results = {}
+    valid = []
+    for row_number, raw in enumerate(rows, start=1):
+        try:
+            valid.append((row_number, device_schema.DeviceCreate.model_validate(raw)))
+        except ValidationError as e:
+            dev_eui = raw.get("dev_eui") if isinstance(raw, dict) else None
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results[row_number] = device_schema.DeviceBulkResult(
+                row=row_number, dev_eui=dev_eui, status="error", detail=errors
+            )
+
+    existing_euis = crud_device.get_existing_euis(db, [d.dev_eui for _, d in valid])
+    existing_centers = crud_device.get_existing_center_ids(db, {d.center_id for _, d in valid})
+
+    to_create = []
+    seen_euis = set()
+    for row_number, device_in in valid:
+        if device_in.dev_eui in existing_euis:
+            detail = "Device EUI already registered"
+        elif device_in.dev_eui in seen_euis:
+            detail = "Device EUI duplicated in this upload"
+        elif device_in.center_id not in existing_centers:
+            detail = "Center not found"
+        else:
+            seen_euis.add(device_in.dev_eui)
+            to_create.append((row_number, device_in))
+            continue
+        results[row_number] = device_schema.DeviceBulkResult(
+            row=row_number, dev_eui=device_in.dev_eui, status="error", detail=detail
+        )
+
+    try:
+        created_ids = crud_device.bulk_create_devices(db, [d for _, d in to_create])
+    except IntegrityError:
+        # Otro proceso registró alguno de los EUIs entre la validación y el insert
+        raise HTTPException(status_code=409, detail="Conflicto al insertar: reintente la carga")
+
+    for row_number, device_in in to_create:
+        results[row_number] = device_schema.DeviceBulkResult(
+            row=row_number, dev_eui=device_in.dev_eui, status="created",
+            id=created_ids.get(device_in.dev_eui)
+        )
+
+    ordered = [results[row] for row in sorted(results)]
+    return device_schema.DeviceBulkResponse(
+        created=len(to_create),
+        errors=len(ordered) - len(to_create),
+        results=ordered
+    )
+
+
+@router.post("/devices/bulk", response_model=device_schema.DeviceBulkResponse)
+def create_devices_bulk(
+    devices: List[Dict[str, Any]],
+    db: Session = Depends(get_db),
+):
+    """
+    Alta masiva de dispositivos (JSON: lista de objetos como en POST /devices).
+    Devuelve el resultado de cada fila.
+    """
+    return _provision_devices(db, devices)
+
+
+@router.post("/devices/bulk/csv", response_model=device_schema.DeviceBulkResponse)
+def create_devices_bulk_csv(
+    file: UploadFile = File(..., description="CSV con columnas name, dev_eui, status, center_id, type"),
+    db: Session = Depends(get_db),
+):
+    """
+    Alta masiva de dispositivos desde un CSV con encabezado.
+    La fila 1 del resultado es la primera fila de datos.
+    """
+    try:
+        content = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar en UTF-8")
+    rows = [
+        {key.strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+        for row in csv.DictReader(io.StringIO(content))
+    ]
+    return _provision_devices(db, rows)
+
+
 @router.get("/devices/details", response_model=List[device_schema.DeviceDetails])
 def read_devices_with_details(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor de X-Next-Cursor (reemplaza a skip)"),
     db: Session = Depends(get_db),
 ):
     """
     Obtiene todos los dispositivos con detalles de centro y compañía
     para la tabla principal de estadísticas.
     """
-    devices = crud_device.get_devices_with_details(db, skip=skip, limit=limit)
+    after = decode_cursor(cursor, 4, (str, str, str, int)) if cursor else None
+    devices = crud_device.get_devices_with_details(db, skip=skip, limit=limit, after=after)
+    set_next_cursor(
+        response, devices, limit,
+        key=lambda d: [d["company_name"], d["center_name"], d["name"], d["id"]]
+    )
     return devices
 
 
+@router.get("/devices/export")
+async def export_devices_history(
+    dev_euis: List[str] = Query(..., description="Uno o más EUI (repetir el parámetro)"),
+    start_date: datetime.datetime = Query(..., description="Fecha de inicio (ISO format)"),
+    end_date: datetime.datetime = Query(..., description="Fecha de fin (ISO format)"),
+    format: ExportFormat = Query(ExportFormat.csv, description="csv, ndjson o parquet"),
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """
+    Exporta el historial CRUDO (resolución completa) de uno o varios
+    dispositivos, en streaming: memoria constante para cualquier rango.
+    """
+    if format == ExportFormat.parquet and not history_export.PARQUET_AVAILABLE:
+        raise HTTPException(status_code=400, detail="Exportación Parquet no disponible: falta instalar 'pyarrow'")
+
+    requested_euis = list(dict.fromkeys(dev_euis))
+    devices = crud_device.get_devices_by_euis_for_user(db, requested_euis, current_user.id)
+    devices_by_eui = {d.dev_eui: d for d in devices}
+
+    missing = [eui for eui in requested_euis if eui not in devices_by_eui]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Dispositivos no encontrados o sin permisos: {missing}")
+
+    sources = []
+    for eui in requested_euis:
+        device_type = devices_by_eui[eui].type
+        if device_type == "combustible":
+            collection = mongodb.db_fuel[settings.MONGO_COLLECTION_NAME2]
+        else:
+            collection = mongodb.db_energy[settings.MONGO_COLLECTION_NAME]
+        sources.append((collection, eui, device_type))
+
+    filename = f"historial_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{format.value}"
+    return StreamingResponse(
+        history_export.stream_export(
+            sources, format, start_date, end_date, settings.EXPORT_BATCH_SIZE
+        ),
+        media_type=history_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/devices/history", response_model=device_schema.MultiDeviceHistory)
+async def get_multi_device_history(
+    dev_euis: List[str] = Query(..., description="EUIs a comparar (repetir el parámetro)"),
+    start_date: datetime.datetime = Query(..., description="Fecha de inicio (ISO format)"),
+    end_date: datetime.datetime = Query(..., description="Fecha de fin (ISO format)"),
+    resolution: str = Query("auto", description="auto, 1m, 5m, 15m, 30m, 1h, 3h, 6h, 12h o 1d"),
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """
+    Historial de VARIOS dispositivos para superponer en un gráfico:
+    una consulta SQL para validar permisos, un pipeline por colección ($in)
+    y todas las series alineadas al mismo eje de buckets.
+    """
+    requested_euis = list(dict.fromkeys(dev_euis))
+    devices = crud_device.get_devices_by_euis_for_user(db, requested_euis, current_user.id)
+    devices_by_eui = {d.dev_eui: d for d in devices}
+
+    missing = [eui for eui in requested_euis if eui not in devices_by_eui]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Dispositivos no encontrados o sin permisos: {missing}")
+
+    if resolution == "auto":
+        bin_size, unit = choose_bucket(start_date, end_date, 500)
+    else:
+        try:
+            bin_size, unit = parse_bucket_label(resolution)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if bucket_count(start_date, end_date, bin_size, unit) > MAX_HISTORY_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"Resolución demasiado fina para el rango (máx. {MAX_HISTORY_BUCKETS} puntos)")
+
+    # Un pipeline por colección (energía / combustible) con todos sus EUIs
+    euis_by_type = {}
+    for eui in requested_euis:
+        euis_by_type.setdefault(devices_by_eui[eui].type.value, []).append(eui)
+
+    async def _run_pipeline(device_type: str, euis: List[str]) -> List[dict]:
+        if device_type == "combustible":
+            mongo_collection = mongodb.db_fuel[settings.MONGO_COLLECTION_NAME2]
+        else:
+            mongo_collection = mongodb.db_energy[settings.MONGO_COLLECTION_NAME]
+
+        agg_fields = {}
+        for field in HISTORY_FIELDS[device_type]:
+            agg_fields[f"{field}_min"] = { "$min": f"$object.{field}" }
+            agg_fields[f"{field}_max"] = { "$max": f"$object.{field}" }
+
+        pipeline = [
+            {"$match": {
+                "deviceInfo.devEui": {"$in": euis},
+                "time": { "$gte": start_date, "$lte": end_date },
+                "object": { "$exists": True, "$ne": None }
+            }},
+            {"$group": {
+                "_id": {"devEui": "$deviceInfo.devEui", "time": date_trunc_expr(bin_size, unit)},
+                **agg_fields
+            }}
+        ]
+        return await slow_queries.aggregate(mongo_collection, pipeline)
+
+    results = await asyncio.gather(*(
+        _run_pipeline(device_type, euis) for device_type, euis in euis_by_type.items()
+    ))
+    bucket_docs = [doc for docs in results for doc in docs]
+
+    # Eje común: todos los buckets con datos en algún dispositivo
+    timestamps = sorted({doc["_id"]["time"] for doc in bucket_docs})
+    position = {t: i for i, t in enumerate(timestamps)}
+
+    series_by_eui = {}
+    for eui in requested_euis:
+        device = devices_by_eui[eui]
+        keys = [f"{f}_{s}" for f in HISTORY_FIELDS[device.type.value] for s in ("min", "max")]
+        series_by_eui[eui] = device_schema.DeviceHistorySeries(
+            devEui=eui,
+            name=device.name,
+            type=device.type,
+            values={key: [None] * len(timestamps) for key in keys}
+        )
+
+    for doc in bucket_docs:
+        series = series_by_eui[doc["_id"]["devEui"]]
+        i = position[doc["_id"]["time"]]
+        for key, values in series.values.items():
+            values[i] = doc.get(key)
+
+    return device_schema.MultiDeviceHistory(
+        resolution=bucket_label(bin_size, unit),
+        timestamps=[t.replace(tzinfo=datetime.timezone.utc) if t.tzinfo is None else t for t in timestamps],
+        series=[series_by_eui[eui] for eui in requested_euis]
+    )
+
+
 @router.get("/devices/{device_id}", response_model=device_schema.DeviceWithLatestData)
 async def get_device_with_latest_data(
     device_id: int,
@@ -67,7 +336,8 @@ async def get_device_with_latest_data(
     else:
         raise HTTPException(status_code=400, detail=f"Unknown device type: {device.type}")
 
-    latest_data_doc = await mongo_collection.find_one(
+    latest_data_doc = await slow_queries.find_one(
+        mongo_collection,
         {"deviceInfo.devEui": device.dev_eui},
         sort=[("time", pymongo.DESCENDING)]
     )
@@ -87,14 +357,18 @@ async def get_device_with_latest_data(
 
 @router.get("/devices", response_model=List[device_schema.Device])
 def read_devices(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor de X-Next-Cursor (reemplaza a skip)"),
     db: Session = Depends(get_db),
 ):
     """
     Obtiene una lista de todos los dispositivos.
     """
-    devices = crud_device.get_devices(db, skip=skip, limit=limit)
+    after_id = decode_id_cursor(cursor) if cursor else None
+    devices = crud_device.get_devices(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, devices, limit, key=lambda d: [d.id])
     return devices
 
 @router.get("/devices/by_center/{center_id}", response_model=List[device_schema.Device])
@@ -148,24 +422,25 @@ def delete_device(
 @router.get("/devices/{dev_eui}/history", response_model=List[device_schema.MongoHistoryRecord])
 async def get_device_history(
     dev_eui: str,
+    response: Response,
     start_date: datetime.datetime = Query(..., description="Fecha de inicio (ISO format)"),
     end_date: datetime.datetime = Query(..., description="Fecha de fin (ISO format)"),
+    since: Optional[str] = Query(None, description="Timestamp ISO o cursor de X-Sync-Cursor: devuelve solo lo nuevo"),
     db: Session = Depends(get_db)
 ):
     """
-    Obtiene el historial de un sensor, AGREGADO en ~500 puntos (Min/Max)
+    Obtiene el historial de un sensor, AGREGADO en buckets fijos (máx. ~500, Min/Max)
     para optimizar la visualización de picos.
+    Con `since` devuelve solo los buckets desde el que contiene `since` (ese
+    primero reemplaza al último que tenía el cliente) y X-Sync-Cursor para
+    el próximo refresco.
     """
-    
-    print("\n--- INICIO DE DEBUG: get_device_history (CON AGREGACIÓN MIN/MAX) ---")
-    
+
     db_device = crud_device.get_device_by_eui(db, dev_eui=dev_eui)
     
     if not db_device:
         raise HTTPException(status_code=440, detail=f"Device with EUI {dev_eui} not found in SQL database")
 
-    print(f"Dispositivo encontrado en SQL. Campo 'type': '{db_device.type}'")
-
     mongo_collection: AsyncIOMotorCollection
     db_name: str
     
@@ -175,18 +450,16 @@ async def get_device_history(
     device_type_str = db_device.type 
 
     if device_type_str == "combustible":
-        print("Lógica: 'combustible'. Configurando agregación Min/Max.")
         mongo_collection = mongodb.db_fuel[settings.MONGO_COLLECTION_NAME2]
         db_name = settings.MONGO_FUEL_DB_NAME
         
-        fields_to_agg = ["volume_L_S0", "volume_L_S1", "pressure_Bar_S0"]
+        fields_to_agg = HISTORY_FIELDS["combustible"]
         
     elif device_type_str == "energia":
-        print("Lógica: 'energia'. Configurando agregación Min/Max.")
         mongo_collection = mongodb.db_energy[settings.MONGO_COLLECTION_NAME]
         db_name = settings.MONGO_DB_NAME
         
-        fields_to_agg = ["agg_activePower", "agg_voltage", "agg_current"] 
+        fields_to_agg = HISTORY_FIELDS["energia"]
     else:
         raise HTTPException(status_code=400, detail=f"Unknown or unsupported device type: {db_device.type}")
         
@@ -200,46 +473,60 @@ async def get_device_history(
         project_object_fields[field_min] = f"${field_min}"
         project_object_fields[field_max] = f"${field_max}"
     
-    print(f"Acceso a Mongo: DB='{db_name}', Colección='{mongo_collection.name}'")
+    logger.debug(
+        "get_device_history %s: tipo=%s, colección=%s.%s",
+        dev_eui, device_type_str, db_name, mongo_collection.name
+    )
     
 
+    # Buckets de ancho fijo (hora local de Chile), máximo ~500 según el rango
+    bin_size, unit = choose_bucket(start_date, end_date, 500)
+
+    # Cursor: hasta dónde incluye datos esta respuesta, sin pasar de "ahora"
+    # menos el margen de llegada (las lecturas en vuelo quedan después)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    aware_end = end_date if end_date.tzinfo else end_date.replace(tzinfo=datetime.timezone.utc)
+    set_sync_cursor(response, min(aware_end, sync_horizon(now)))
+
+    match_start = start_date
+    if since:
+        # El bucket que contiene `since` pudo recibir más lecturas: se reenvía entero
+        since_bucket = bucket_floor(parse_since(since), bin_size, unit)
+        aware_start = start_date if start_date.tzinfo else start_date.replace(tzinfo=datetime.timezone.utc)
+        match_start = max(aware_start, since_bucket)
+
     match_stage = {
         "$match": {
             "deviceInfo.devEui": dev_eui,
-            "time": { "$gte": start_date, "$lte": end_date },
+            "time": { "$gte": match_start, "$lte": end_date },
             "object": { "$exists": True, "$ne": None }
         }
     }
-    
-    bucket_stage = {
-        "$bucketAuto": {
-            "groupBy": "$time",
-            "buckets": 500,
-            "output": {
-                "time": { "$min": "$time" },
-                **agg_fields
-            }
+
+    # El $sort antes del $group permite recorrer el índice (devEui, time)
+    # en orden, sin el sort bloqueante que exigía $bucketAuto
+    index_sort_stage = { "$sort": { "time": 1 } }
+
+    group_stage = {
+        "$group": {
+            "_id": date_trunc_expr(bin_size, unit),
+            **agg_fields
         }
     }
     
     project_stage = {
         "$project": {
             "_id": 0, 
-            "time": "$time",
+            "time": "$_id",
             "object": project_object_fields 
         }
     }
     
     sort_stage = { "$sort": { "time": 1 } }
     
-    pipeline = [ match_stage, bucket_stage, project_stage, sort_stage ]
-    
-    print(f"Mongo Pipeline: {pipeline}")
-    
-    cursor = mongo_collection.aggregate(pipeline)
-    historical_docs = await cursor.to_list(length=None)
+    pipeline = [ match_stage, index_sort_stage, group_stage, project_stage, sort_stage ]
     
-    print(f"Documentos (agregados) encontrados: {len(historical_docs)}")
-    print("--- FIN DE DEBUG ---\n")
+    # Si tarda más de MONGO_SLOW_QUERY_MS queda en /api/admin/slow-queries con su explain
+    historical_docs = await slow_queries.aggregate(mongo_collection, pipeline)
     
     return historical_docs
\ No newline at end of file
@@ -1,18 +1,24 @@
+import asyncio
 import datetime
 import pytz
 from fastapi import Query
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from motor.motor_asyncio import AsyncIOMotorCollection
-from typing import List
+from typing import Dict, List, Optional
 import pymongo
 import random
 import calendar
 from app.db.database import get_db
-from app.db import mongodb
+from app.db import mongodb, slow_queries
 from app.core.config import settings
+from app.core.time_buckets import bucket_floor, bucket_seconds, choose_bucket, date_trunc_expr
+from app.core.pagination import parse_since, set_sync_cursor, sync_horizon
+from app.core.etag import etag_matches, latest_reading_times, make_etag, not_modified
+from app.core.compression import cached_response, set_cache_ttl
+from app.core.single_flight import SingleFlight
 from app.api.dependencies import get_current_active_user
-from app.models import user as user_model
+from app.core.auth_cache import UserSnapshot
 from app.models import center as center_model
 from app.models.association import UserCompany
 from app.models.device import Device, DeviceType
@@ -22,6 +28,10 @@ from enum import Enum
 
 CHILE_TZ = pytz.timezone("America/Santiago")
 
+# Un cálculo por ETag a la vez: los requests idénticos concurrentes esperan al mismo
+summary_flights = SingleFlight("energy_summary")
+details_flights = SingleFlight("energy_details")
+
 router = APIRouter()
 ALL_HISTORICAL_FIELDS = {
     "consumption": "object.agg_activeEnergy",
@@ -72,101 +82,138 @@ def _generate_mock_alerts(obj: dict) -> List[DeviceAlert]:
         ))
     return alerts
 
-@router.get(
-    "/summary",
-    response_model=List[DeviceSummary],
-    summary="Obtiene un resumen de todos los dispositivos de energía del usuario"
-)
-async def get_energy_summary(
-    db: Session = Depends(get_db),
-    current_user: user_model.User = Depends(get_current_active_user),
-    time_range: str = Query(
-        "1d", 
-        description="Rango de tiempo: 5m, 30m, 1h, 6h, 12h, 1d, 7d, 14d, 30d"
+def _history_time_label(time_utc: datetime.datetime, days_to_query: int) -> str:
+    if time_utc and time_utc.tzinfo is None:
+        time_utc = time_utc.replace(tzinfo=datetime.timezone.utc)
+    time_santiago = time_utc.astimezone(CHILE_TZ)
+    return time_santiago.strftime("%d-%m") if days_to_query > 1 else time_santiago.strftime("%H:%M")
+
+
+def _flatten_aggregated_history(aggregated_docs: List[dict], days_to_query: int) -> dict:
+    """ Buckets agregados ($dateTrunc, _id = inicio del bucket) -> puntos por campo """
+    daily_data_raw = {field_key: [] for field_key in ALL_HISTORICAL_FIELDS.keys()}
+    for doc in aggregated_docs:
+        try:
+            time_str = _history_time_label(doc["_id"], days_to_query)
+            for field_key in ALL_HISTORICAL_FIELDS.keys():
+                value = doc.get(field_key, 0)
+                daily_data_raw[field_key].append({"time": time_str, "value": value})
+        except Exception:
+            continue
+    return daily_data_raw
+
+
+def _flatten_raw_history(historical_docs: List[dict], days_to_query: int) -> dict:
+    """ Documentos crudos (time + object) -> puntos por campo """
+    daily_data_raw = {field_key: [] for field_key in ALL_HISTORICAL_FIELDS.keys()}
+    for doc in historical_docs:
+        try:
+            time_str = _history_time_label(doc["time"], days_to_query)
+            obj = doc.get("object", {})
+            for field_key, field_path in ALL_HISTORICAL_FIELDS.items():
+                key_in_obj = field_path.split('.', 1)[1]
+                value = obj.get(key_in_obj, 0)
+                daily_data_raw[field_key].append({"time": time_str, "value": value})
+        except Exception:
+            continue
+    return daily_data_raw
+
+
+# time_range -> (ancho de la ventana, días para las etiquetas, ¿agregar en buckets?)
+# Rangos <= 1 día usan datos crudos; 7d, 14d y 30d, agregación. Default: 1d.
+SUMMARY_TIME_RANGES = {
+    "5m": (datetime.timedelta(minutes=5), 0, False),
+    "30m": (datetime.timedelta(minutes=30), 0, False),
+    "1h": (datetime.timedelta(hours=1), 0, False),
+    "6h": (datetime.timedelta(hours=6), 0, False),
+    "12h": (datetime.timedelta(hours=12), 0, False),
+    "1d": (datetime.timedelta(days=1), 1, False),
+    "7d": (datetime.timedelta(days=7), 7, True),
+    "14d": (datetime.timedelta(days=14), 14, True),
+    "30d": (datetime.timedelta(days=30), 30, True),
+}
+# Máximo de buckets para la agregación (el ancho se elige con choose_bucket)
+SUMMARY_MAX_BUCKETS = 1500
+
+
+def _summary_window(time_range: str) -> tuple:
+    return SUMMARY_TIME_RANGES.get(time_range, SUMMARY_TIME_RANGES["1d"])
+
+
+def _window_step_seconds(time_range: str, request_time: datetime.datetime) -> int:
+    """ Granularidad de la ventana: el bucket en rangos agregados, SUMMARY_WINDOW_STEP_SECONDS en los crudos """
+    span, _, use_aggregation = _summary_window(time_range)
+    if use_aggregation:
+        return bucket_seconds(*choose_bucket(request_time - span, request_time, SUMMARY_MAX_BUCKETS))
+    return settings.SUMMARY_WINDOW_STEP_SECONDS
+
+
+def _window_version(time_range: str, request_time: datetime.datetime) -> datetime.datetime:
+    """
+    Borde de la ventana deslizante redondeado a su granularidad (el bucket
+    en rangos agregados, SUMMARY_WINDOW_STEP_SECONDS en los crudos). Va en el
+    ETag: historial y consumo (último - primero dentro de la ventana) cambian
+    con el tiempo aunque el dispositivo no reporte.
+    """
+    span, _, use_aggregation = _summary_window(time_range)
+    if use_aggregation:
+        bin_size, unit = choose_bucket(request_time - span, request_time, SUMMARY_MAX_BUCKETS)
+        return bucket_floor(request_time, bin_size, unit)
+    step = settings.SUMMARY_WINDOW_STEP_SECONDS
+    return datetime.datetime.fromtimestamp(
+        request_time.timestamp() // step * step, datetime.timezone.utc
     )
-):
+
+
+async def _latest_readings(
+    mongo_collection: AsyncIOMotorCollection,
+    dev_euis: List[str]
+) -> Dict[str, Optional[dict]]:
     """
-    Este endpoint entrega una lista de todos los dispositivos.
-    - Usa datos crudos para rangos <= 1 día.
-    - Usa agregación ($bucketAuto) para rangos > 1 día (7d, 14d, 30d).
+    Último documento (con object) de cada dispositivo, en paralelo. Se lee
+    una sola vez: de aquí sale el ETag y lo reutiliza _build_energy_summary.
     """
-    
-    mongo_collection = mongodb.db_energy[settings.MONGO_COLLECTION_NAME]
+    async def _latest(dev_eui: str):
+        doc = await slow_queries.find_one(
+            mongo_collection,
+            {"deviceInfo.devEui": dev_eui, "object": { "$type": "object" }},
+            sort=[("time", pymongo.DESCENDING)]
+        )
+        return dev_eui, doc
 
-    # 1. Obtener permisos de usuario
-    user_company_links = db.query(UserCompany).filter(
-        UserCompany.user_id == current_user.id
-    ).all()
-    if not user_company_links:
-        return [] 
-    allowed_company_ids = [link.company_id for link in user_company_links]
+    return dict(await asyncio.gather(*(_latest(eui) for eui in dev_euis)))
 
-    # 2. Obtener dispositivos de Postgres
-    devices_from_db = db.query(Device)\
-        .join(center_model.Center)\
-        .filter(
-            center_model.Center.company_id.in_(allowed_company_ids),
-            Device.type == DeviceType.energia
-        )\
-        .all()
-    
+
+async def _build_energy_summary(
+    devices_from_db: List[Device],
+    latest_docs: Dict[str, Optional[dict]],
+    mongo_collection: AsyncIOMotorCollection,
+    time_range: str,
+    since_time: Optional[datetime.datetime],
+    request_time: datetime.datetime
+) -> List[DeviceSummary]:
+    """ Arma el summary de get_energy_summary (consultas a Mongo por dispositivo) """
     summary_list = []
 
     # 3. Iterar por cada dispositivo
     for i, device_pg in enumerate(devices_from_db):
-        latest_data_doc = await mongo_collection.find_one(
-            {"deviceInfo.devEui": device_pg.dev_eui, "object": { "$type": "object" }},
-            sort=[("time", pymongo.DESCENDING)]
-        )
+        latest_data_doc = latest_docs.get(device_pg.dev_eui)
 
         if not latest_data_doc:
             continue
 
+        latest_time = latest_data_doc.get("time")
+        if since_time and isinstance(latest_time, datetime.datetime):
+            if latest_time.tzinfo is None:
+                latest_time = latest_time.replace(tzinfo=datetime.timezone.utc)
+            if latest_time <= since_time:
+                continue  # sin lecturas nuevas: el cliente conserva lo que tiene
+
         # --- Lógica de Rango de Tiempo y Flag de Agregación ---
-        end_time = datetime.datetime.now(datetime.timezone.utc)
-        USE_AGGREGATION = False # Por defecto, traemos datos crudos
-        
-        # --- ¡CAMBIO SOLICITADO! ---
-        # Define el número de buckets deseado para la agregación
-        num_buckets = 1500
-        
-        if time_range == "5m":
-            start_time = end_time - datetime.timedelta(minutes=5)
-            days_to_query = 0
-        elif time_range == "30m":
-            start_time = end_time - datetime.timedelta(minutes=30)
-            days_to_query = 0
-        elif time_range == "1h":
-            start_time = end_time - datetime.timedelta(hours=1)
-            days_to_query = 0
-        elif time_range == "6h":
-            start_time = end_time - datetime.timedelta(hours=6)
-            days_to_query = 0
-        elif time_range == "12h":
-            start_time = end_time - datetime.timedelta(hours=12)
-            days_to_query = 0
-        
-        # --- RANGOS LARGOS (Aquí activamos la agregación) ---
-        elif time_range == "7d":
-            start_time = end_time - datetime.timedelta(days=7)
-            days_to_query = 7
-            USE_AGGREGATION = True
-        elif time_range == "14d":
-            start_time = end_time - datetime.timedelta(days=14)
-            days_to_query = 14
-            USE_AGGREGATION = True
-        elif time_range == "30d":
-            start_time = end_time - datetime.timedelta(days=30)
-            days_to_query = 30
-            USE_AGGREGATION = True
-        # --- Fin Rangos Largos ---
-            
-        else: # default 1d
-            start_time = end_time - datetime.timedelta(days=1)
-            days_to_query = 1
-            # Mantenemos USE_AGGREGATION = False para 1d
+        end_time = request_time
+        span, days_to_query, USE_AGGREGATION = _summary_window(time_range)
+        start_time = end_time - span
 
-        
         # --- CÁLCULO DE CONSUMO EFICIENTE (Se mantiene igual para todos) ---
         base_query = {
             "deviceInfo.devEui": device_pg.dev_eui,
@@ -179,11 +226,11 @@ async def get_energy_summary(
             "object.phaseB_activeEnergy": 1, "object.phaseC_activeEnergy": 1,
         }
         
-        first_doc = await mongo_collection.find_one(
-            base_query, projection=projection_energy, sort=[("time", pymongo.ASCENDING)]
+        first_doc = await slow_queries.find_one(
+            mongo_collection, base_query, projection=projection_energy, sort=[("time", pymongo.ASCENDING)]
         )
-        last_doc = await mongo_collection.find_one(
-            base_query, projection=projection_energy, sort=[("time", pymongo.DESCENDING)]
+        last_doc = await slow_queries.find_one(
+            mongo_collection, base_query, projection=projection_energy, sort=[("time", pymongo.DESCENDING)]
         )
 
         total_agg_wh, total_a_wh, total_b_wh, total_c_wh = 0, 0, 0, 0
@@ -197,45 +244,39 @@ async def get_energy_summary(
         
         
         # --- OBTENCIÓN DE DATOS HISTÓRICOS (HÍBRIDO) ---
-        daily_data_raw = {field_key: [] for field_key in ALL_HISTORICAL_FIELDS.keys()}
-
         if USE_AGGREGATION:
             # --- RUTA 1: AGREGACIÓN (7d, 14d, 30d) ---
             
-            bucket_outputs = {"time": {"$first": "$time"}}
+            # Buckets de ancho fijo (hora local de Chile) según el rango pedido
+            bin_size, unit = choose_bucket(start_time, end_time, SUMMARY_MAX_BUCKETS)
+
+            history_query = base_query
+            if since_time:
+                # El bucket que contiene `since` pudo recibir más lecturas: se reenvía entero
+                history_start = max(start_time, bucket_floor(since_time, bin_size, unit))
+                history_query = {**base_query, "time": {"$gte": history_start, "$lte": end_time}}
+
+            bucket_outputs = {}
             for field_key, field_path in ALL_HISTORICAL_FIELDS.items():
                 if "Energy" in field_path or "consumption" in field_key:
                     bucket_outputs[field_key] = {"$last": f"${field_path}"}
                 else:
                     bucket_outputs[field_key] = {"$avg": f"${field_path}"}
 
+            # $match + $sort usan el índice (devEui, time); el $group no
+            # necesita ordenar todo el rango como $bucketAuto
             pipeline = [
-                {"$match": base_query},
-                {"$bucketAuto": {
-                    "groupBy": "$time",
-                    "buckets": num_buckets, # <-- Aquí se usa el valor 2000
-                    "output": bucket_outputs
+                {"$match": history_query},
+                {"$sort": {"time": 1}},
+                {"$group": {
+                    "_id": date_trunc_expr(bin_size, unit),
+                    **bucket_outputs
                 }},
-                {"$sort": {"time": 1}}
+                {"$sort": {"_id": 1}}
             ]
-            historical_cursor = mongo_collection.aggregate(pipeline)
-            aggregated_docs = await historical_cursor.to_list(length=None) 
-
-            # Procesar docs agregados (loop rápido)
-            for doc in aggregated_docs:
-                try:
-                    time_utc = doc["time"]
-                    if time_utc and time_utc.tzinfo is None:
-                        time_utc = time_utc.replace(tzinfo=datetime.timezone.utc)
-                    time_santiago = time_utc.astimezone(CHILE_TZ)
-                    
-                    time_str = time_santiago.strftime("%d-%m") if days_to_query > 1 else time_santiago.strftime("%H:%M")
-                    
-                    for field_key in ALL_HISTORICAL_FIELDS.keys():
-                        value = doc.get(field_key, 0) 
-                        daily_data_raw[field_key].append({"time": time_str, "value": value})
-                except Exception:
-                    continue
+            aggregated_docs = await slow_queries.aggregate(mongo_collection, pipeline)
+
+            daily_data_raw = _flatten_aggregated_history(aggregated_docs, days_to_query)
 
         else:
             # --- RUTA 2: DATOS CRUDOS (5m, 30m, 1h, 6h, 12h, 1d) ---
@@ -244,31 +285,18 @@ async def get_energy_summary(
             for field_path in ALL_HISTORICAL_FIELDS.values():
                 projection_historical[field_path] = 1
             
-            historical_cursor = mongo_collection.find(
-                base_query,
-                projection=projection_historical
-            ).sort("time", pymongo.ASCENDING)
-
-            historical_docs = await historical_cursor.to_list(length=None) 
-
-            # Procesar docs crudos (tu loop original)
-            for doc in historical_docs:
-                try:
-                    time_utc = doc["time"]
-                    if time_utc and time_utc.tzinfo is None:
-                        time_utc = time_utc.replace(tzinfo=datetime.timezone.utc)
-                    time_santiago = time_utc.astimezone(CHILE_TZ)
-                    
-                    time_str = time_santiago.strftime("%d-%m") if days_to_query > 1 else time_santiago.strftime("%H:%M")
-                    
-                    obj = doc.get("object", {})
-                    
-                    for field_key, field_path in ALL_HISTORICAL_FIELDS.items():
-                        key_in_obj = field_path.split('.', 1)[1]
-                        value = obj.get(key_in_obj, 0)
-                        daily_data_raw[field_key].append({"time": time_str, "value": value})
-                except Exception:
-                    continue
+            history_query = base_query
+            if since_time:
+                history_query = {**base_query, "time": {"$gt": max(start_time, since_time), "$lte": end_time}}
+
+            historical_docs = await slow_queries.find(
+                mongo_collection,
+                history_query,
+                projection=projection_historical,
+                sort=[("time", pymongo.ASCENDING)]
+            )
+
+            daily_data_raw = _flatten_raw_history(historical_docs, days_to_query)
         
         # --- FIN DE LA BIFURCACIÓN ---
 
@@ -288,9 +316,12 @@ async def get_energy_summary(
         }
         alerts = _generate_mock_alerts(latest_obj) 
         
-        device_info_data = latest_data_doc.get("deviceInfo", {})
-        device_info_data["deviceName"] = device_pg.name
-        device_info_data["location"] = f"Centro: {device_pg.center_id}"
+        # Copia: latest_docs es compartido (de ahí sale también el ETag)
+        device_info_data = {
+            **latest_data_doc.get("deviceInfo", {}),
+            "deviceName": device_pg.name,
+            "location": f"Centro: {device_pg.center_id}",
+        }
         mongo_id = latest_data_doc.get("_id")
         
         time_obj = latest_data_doc.get("time")
@@ -318,41 +349,104 @@ async def get_energy_summary(
 
     return summary_list
 
+
 @router.get(
-    "/details/{dev_eui}",
-    response_model=DeviceDetailsResponse,
-    summary="Obtiene los detalles de consumo diario y mensual de un dispositivo"
+    "/summary",
+    response_model=List[DeviceSummary],
+    summary="Obtiene un resumen de todos los dispositivos de energía del usuario"
 )
-async def get_device_details(
-    dev_eui: str,
-    days: int = Query(30, description="Número de días para el gráfico diario"),
+async def get_energy_summary(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: user_model.User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    time_range: str = Query(
+        "1d", 
+        description="Rango de tiempo: 5m, 30m, 1h, 6h, 12h, 1d, 7d, 14d, 30d"
+    ),
+    since: Optional[str] = Query(
+        None,
+        description="Timestamp ISO o cursor de X-Sync-Cursor: devuelve solo lo nuevo"
+    )
 ):
     """
-    Calcula el consumo diario (últimos N días) y mensual (últimos 12 meses)
-    usando la resta directa entre el valor final e inicial del contador
-    (agg_activeEnergy), en lugar de sumar deltas.
+    Este endpoint entrega una lista de todos los dispositivos.
+    - Usa datos crudos para rangos <= 1 día.
+    - Usa agregación en buckets fijos ($dateTrunc) para rangos > 1 día (7d, 14d, 30d).
+    - Con `since`: omite los dispositivos sin lecturas nuevas y el historial
+      trae solo los puntos posteriores (en rangos agregados, desde el bucket
+      que contiene `since`, que reemplaza al último que tenía el cliente).
+      La respuesta trae X-Sync-Cursor para el próximo refresco: "ahora"
+      menos el margen de llegada, así las lecturas en vuelo no se pierden
+      (los puntos de ese margen pueden repetirse).
+    - ETag según la última lectura de cada dispositivo y el borde de la
+      ventana (redondeado a su granularidad): con If-None-Match
+      igual responde 304 sin recalcular, y si otro request ya armó la misma
+      respuesta se sirve desde la caché de respuestas.
+    - Requests idénticos concurrentes (mismo ETag: misma consulta, mismos
+      dispositivos y mismas lecturas) comparten un solo cálculo.
     """
+    
+    since_time = parse_since(since) if since else None
+    # Mismo "ahora" para todos los dispositivos; el cursor queda un margen antes
+    request_time = datetime.datetime.now(datetime.timezone.utc)
+    sync_cursor = sync_horizon(request_time)
+    set_sync_cursor(response, sync_cursor)
 
     mongo_collection = mongodb.db_energy[settings.MONGO_COLLECTION_NAME]
+
+    # 1. Obtener permisos de usuario
     user_company_links = db.query(UserCompany).filter(
         UserCompany.user_id == current_user.id
     ).all()
     if not user_company_links:
-        raise HTTPException(status_code=403, detail="Usuario no asociado a ninguna empresa")
-
+        return [] 
     allowed_company_ids = [link.company_id for link in user_company_links]
-    device_pg = db.query(Device).join(center_model.Center).filter(
-        Device.dev_eui == dev_eui,
-        center_model.Center.company_id.in_(allowed_company_ids)
-    ).first()
 
-    if not device_pg:
-        raise HTTPException(status_code=404, detail="Dispositivo no encontrado o sin permisos")
+    # 2. Obtener dispositivos de Postgres
+    devices_from_db = db.query(Device)\
+        .join(center_model.Center)\
+        .filter(
+            center_model.Center.company_id.in_(allowed_company_ids),
+            Device.type == DeviceType.energia
+        )\
+        .all()
 
-    price_from_db = device_pg.center.price_kwh if device_pg.center else 250.0
+    latest_docs = await _latest_readings(mongo_collection, [d.dev_eui for d in devices_from_db])
+    etag = make_etag(
+        "energy-summary", time_range, since_time,
+        sorted((d.id, d.dev_eui, d.name, d.center_id) for d in devices_from_db),
+        {eui: doc["time"] if doc else None for eui, doc in latest_docs.items()},
+        _window_version(time_range, request_time),
+    )
+    if etag_matches(request, etag):
+        # El cliente igual avanza su cursor: ya tiene todo hasta sync_cursor
+        not_modified_response = not_modified(etag)
+        set_sync_cursor(not_modified_response, sync_cursor)
+        return not_modified_response
+    cached = cached_response(etag)
+    if cached is not None:
+        set_sync_cursor(cached, sync_cursor)
+        return cached
+    response.headers["ETag"] = etag
+    # La entrada de la caché de respuestas no dura más que un paso de la ventana
+    set_cache_ttl(request, _window_step_seconds(time_range, request_time))
+    
+    return await summary_flights.run(
+        etag,
+        lambda: _build_energy_summary(
+            devices_from_db, latest_docs, mongo_collection, time_range, since_time, request_time
+        )
+    )
 
+async def _build_device_details(
+    device_pg: Device,
+    mongo_collection: AsyncIOMotorCollection,
+    days: int,
+    price_from_db: float
+) -> DeviceDetailsResponse:
+    """ Agregaciones diaria y mensual de get_device_details """
+    dev_eui = device_pg.dev_eui
     end_time_utc = datetime.datetime.now(pytz.utc)
     start_time_daily_utc = end_time_utc - datetime.timedelta(days=days)
 
@@ -363,6 +457,8 @@ async def get_device_details(
             "time": {"$gte": start_time_daily_utc, "$lte": end_time_utc},
             "object.agg_activeEnergy": {"$exists": True}
         }},
+        # Ordenar antes del $project para que el sort lo resuelva el índice (devEui, time)
+        {"$sort": {"time": 1}},
         {"$project": {
             "time": "$time",
             "energy": "$object.agg_activeEnergy",
@@ -370,13 +466,11 @@ async def get_device_details(
                 "format": "%Y-%m-%d", "date": "$time", "timezone": "America/Santiago"
             }}
         }},
-        {"$sort": {"time": 1}},
         {"$group": {"_id": "$date_chile", "readings": {"$push": "$energy"}}},
         {"$sort": {"_id": 1}}
     ]
 
-    cursor_daily = mongo_collection.aggregate(pipeline_daily)
-    daily_results = await cursor_daily.to_list(length=None)
+    daily_results = await slow_queries.aggregate(mongo_collection, pipeline_daily)
 
     daily_consumption_list = []
     total_consumption_kwh_30days = 0
@@ -412,6 +506,8 @@ async def get_device_details(
             "time": {"$gte": start_time_monthly_utc, "$lte": end_time_utc},
             "object.agg_activeEnergy": {"$exists": True}
         }},
+        # Ordenar antes del $project para que el sort lo resuelva el índice (devEui, time)
+        {"$sort": {"time": 1}},
         {"$project": {
             "time": "$time",
             "energy": "$object.agg_activeEnergy",
@@ -419,13 +515,11 @@ async def get_device_details(
                 "format": "%Y-%m", "date": "$time", "timezone": "America/Santiago"
             }}
         }},
-        {"$sort": {"time": 1}},
         {"$group": {"_id": "$month_chile", "readings": {"$push": "$energy"}}},
         {"$sort": {"_id": 1}}
     ]
 
-    cursor_monthly = mongo_collection.aggregate(pipeline_monthly)
-    monthly_results = await cursor_monthly.to_list(length=None)
+    monthly_results = await slow_queries.aggregate(mongo_collection, pipeline_monthly)
 
     monthly_consumption_list = []
     month_abbr_es = {
@@ -473,6 +567,66 @@ async def get_device_details(
     )
 
 
+@router.get(
+    "/details/{dev_eui}",
+    response_model=DeviceDetailsResponse,
+    summary="Obtiene los detalles de consumo diario y mensual de un dispositivo"
+)
+async def get_device_details(
+    request: Request,
+    response: Response,
+    dev_eui: str,
+    days: int = Query(30, description="Número de días para el gráfico diario"),
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """
+    Calcula el consumo diario (últimos N días) y mensual (últimos 12 meses)
+    usando la resta directa entre el valor final e inicial del contador
+    (agg_activeEnergy), en lugar de sumar deltas.
+    Lleva ETag (última lectura + precio + metadatos): If-None-Match -> 304.
+    Requests concurrentes con el mismo ETag comparten un solo cálculo.
+    """
+
+    mongo_collection = mongodb.db_energy[settings.MONGO_COLLECTION_NAME]
+    user_company_links = db.query(UserCompany).filter(
+        UserCompany.user_id == current_user.id
+    ).all()
+    if not user_company_links:
+        raise HTTPException(status_code=403, detail="Usuario no asociado a ninguna empresa")
+
+    allowed_company_ids = [link.company_id for link in user_company_links]
+    device_pg = db.query(Device).join(center_model.Center).filter(
+        Device.dev_eui == dev_eui,
+        center_model.Center.company_id.in_(allowed_company_ids)
+    ).first()
+
+    if not device_pg:
+        raise HTTPException(status_code=404, detail="Dispositivo no encontrado o sin permisos")
+
+    price_from_db = device_pg.center.price_kwh if device_pg.center else 250.0
+
+    latest_times = await latest_reading_times(mongo_collection, [dev_eui])
+    etag = make_etag(
+        "energy-details", days,
+        (device_pg.id, device_pg.name, device_pg.center_id), price_from_db,
+        latest_times,
+        # Los buckets diarios/mensuales cambian de día aunque no haya lecturas
+        datetime.datetime.now(CHILE_TZ).date(),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    cached = cached_response(etag)
+    if cached is not None:
+        return cached
+    response.headers["ETag"] = etag
+
+    return await details_flights.run(
+        etag,
+        lambda: _build_device_details(device_pg, mongo_collection, days, price_from_db)
+    )
+
+
 @router.put(
     "/price/{dev_eui}",
     summary="Actualiza el precio de kWh del centro asociado a un dispositivo"
@@ -481,7 +635,7 @@ async def update_center_price_by_device(
     dev_eui: str,
     price_data: CenterPriceUpdate,
     db: Session = Depends(get_db),
-    current_user: user_model.User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
     Este endpoint busca un dispositivo por su EUI, encuentra el
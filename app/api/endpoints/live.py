@@ -0,0 +1,65 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from jose import jwt
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Set
+
+from app.api.dependencies import get_current_user
+from app.core.live_stream import stream_events
+from app.crud import crud_device
+from app.db.database import SessionLocal
+
+router = APIRouter()
+
+
+def _authorized_euis(token: str, dev_euis: Optional[List[str]]) -> Dict[str, str]:
+    """
+    Valida el token y devuelve los EUI (-> tipo) que el usuario puede ver.
+    Usa su propia sesión (no Depends(get_db)) para no retener una conexión
+    del pool mientras el stream siga abierto.
+    """
+    with SessionLocal() as db:
+        user = get_current_user(db=db, token=token)
+        if not user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        allowed = {
+            eui: getattr(device_type, "value", device_type)
+            for eui, device_type in crud_device.get_device_euis_for_user(db, user.id)
+        }
+    if dev_euis:
+        allowed = {eui: device_type for eui, device_type in allowed.items() if eui in dev_euis}
+    return allowed
+
+
+def _still_authorized(token: str) -> Set[str]:
+    """ EUI que el usuario puede ver ahora; vacío si el token o el usuario ya no valen """
+    try:
+        return set(_authorized_euis(token, None))
+    except HTTPException:
+        return set()
+
+
+@router.get("/live/stream")
+async def live_stream(
+    token: str = Query(..., description="Access token (EventSource no permite enviar headers)"),
+    dev_euis: Optional[List[str]] = Query(None, description="Limitar a estos EUI (opcional)")
+):
+    """
+    Server-Sent Events con las lecturas nuevas de energía y combustible de
+    los dispositivos del usuario: un "snapshot" inicial y luego eventos
+    "reading" con solo los campos de `object` que cambiaron.
+    El stream se cierra (evento "close") al vencer el token o si el usuario
+    pierde acceso; el cliente reconecta con un token nuevo.
+    """
+    device_types = await run_in_threadpool(_authorized_euis, token, dev_euis)
+    # El token ya fue verificado: solo se lee su vencimiento
+    exp = jwt.get_unverified_claims(token).get("exp")
+    return StreamingResponse(
+        stream_events(
+            device_types,
+            expires_at=float(exp) if exp is not None else None,
+            reauthorize=lambda: run_in_threadpool(_still_authorized, token),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
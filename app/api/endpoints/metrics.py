@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import auth_cache, compression, metrics, security, single_flight
+from app.core.fuel_parser import parse_stats as fuel_parse_stats
+from app.core.live_stream import live_hub
+from app.db.database import engine
+
+router = APIRouter()
+
+
+def _collect_sql_pool():
+    """ Uso del pool de conexiones de SQLAlchemy al momento del scrape """
+    pool = engine.pool
+    gauge = metrics.Gauge("sqlalchemy_pool_connections", "Conexiones del pool de SQLAlchemy", ["state"])
+    for state, reader in (
+        ("size", "size"), ("checked_out", "checkedout"),
+        ("checked_in", "checkedin"), ("overflow", "overflow"),
+    ):
+        if hasattr(pool, reader):
+            gauge.set(getattr(pool, reader)(), state=state)
+    return [gauge]
+
+
+def _collect_app_stats():
+    """ Contadores internos: parser de combustible, pool de bcrypt, caché de auth y SSE """
+    fuel = metrics.Counter("fuel_parse_total", "Documentos de combustible parseados, por resultado (no_devices cuenta centros)", ["result"])
+    for result, count in fuel_parse_stats.items():
+        fuel.inc(count, result=result)
+
+    password_pool = metrics.Gauge("password_pool", "Pool de bcrypt (workers, en curso, en cola, contadores)", ["state"])
+    for state, value in security.password_pool.snapshot().items():
+        password_pool.set(value, state=state)
+
+    auth = metrics.Counter("auth_cache_total", "Hits / misses de la caché de autenticación", ["result"])
+    for result, count in auth_cache.stats.items():
+        auth.inc(count, result=result)
+
+    responses = metrics.Counter("response_cache_total", "Hits / misses de la caché de respuestas, por codificación", ["result"])
+    for result, count in compression.stats.items():
+        responses.inc(count, result=result)
+
+    flights = metrics.Counter("single_flight_total", "Cálculos lanzados (leader) y requests coalescidos (shared)", ["result"])
+    for result, count in single_flight.stats.items():
+        flights.inc(count, result=result)
+
+    live = metrics.Gauge("live_stream_subscribers", "Conexiones SSE abiertas en /api/live/stream")
+    live.set(live_hub.subscribers)
+    return [fuel, password_pool, auth, responses, flights, live]
+
+
+metrics.REGISTRY.add_collector(_collect_sql_pool)
+metrics.REGISTRY.add_collector(_collect_app_stats)
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """ Métricas en formato de texto de Prometheus """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
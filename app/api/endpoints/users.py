@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.crud import crud_user
 from app.schemas import user as user_schema, company as company_schema
-from app.models import user as user_model
+from app.core.auth_cache import UserSnapshot
 from app.api.dependencies import get_current_active_user
+from app.core.pagination import decode_id_cursor, set_next_cursor
 
 from app.models import association
 from app.models import company
 from app.schemas.user import UserRoleInCompany
-from typing import List
+from collections import Counter
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -22,13 +24,15 @@ def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
     return crud_user.create_user(db=db, user_data=user)
 
 @router.get("/users/me", response_model=user_schema.User)
-def read_users_me(current_user: user_model.User = Depends(get_current_active_user)):
+def read_users_me(current_user: UserSnapshot = Depends(get_current_active_user)):
     return current_user
 
 @router.get("/users", response_model=List[user_schema.User])
 def read_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor de X-Next-Cursor (reemplaza a skip)"),
     db: Session = Depends(get_db),
     # Proteger este endpoint (ej: solo admin)
     # current_user: user_model.User = Depends(get_current_active_user)
@@ -36,7 +40,9 @@ def read_users(
     """
     Obtiene una lista de todos los usuarios.
     """
-    users = crud_user.get_users(db, skip=skip, limit=limit)
+    after_id = decode_id_cursor(cursor) if cursor else None
+    users = crud_user.get_users(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, users, limit, key=lambda u: [u.id])
     return users
 
 @router.get("/users/{user_id}", response_model=user_schema.User)
@@ -103,7 +109,7 @@ def delete_user(
 @router.get("/users/me/roles", response_model=List[UserRoleInCompany])
 def read_user_roles(
     db: Session = Depends(get_db),
-    current_user: user_model.User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
     Obtiene una lista de todas las empresas y roles
@@ -147,15 +153,22 @@ def create_company(
 
 @router.get("/companies", response_model=List[company_schema.CompanyWithCenters])
 def read_companies(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor de X-Next-Cursor (reemplaza a skip)"),
+    with_device_counts: bool = Query(False, description="Incluir cantidad de dispositivos por compañía"),
     db: Session = Depends(get_db),
     # current_user: user_model.User = Depends(get_current_active_user) 
 ):
     """
     Obtiene una lista de todas las compañías, incluyendo sus centros.
     """
-    companies = crud_user.get_companies(db, skip=skip, limit=limit)
+    after_id = decode_id_cursor(cursor) if cursor else None
+    companies = crud_user.get_companies(
+        db, skip=skip, limit=limit, after_id=after_id, with_device_counts=with_device_counts
+    )
+    set_next_cursor(response, companies, limit, key=lambda c: [c.id])
     return companies
 @router.get("/companies/{company_id}", response_model=company_schema.Company)
 def read_company(
@@ -233,4 +246,43 @@ def assign_user_to_company(
     return crud_user.assign_user_to_company(db=db, assignment=assignment)
 
 
+@router.post(
+    "/companies/assign/bulk",
+    response_model=List[company_schema.CompanyAssignment],
+    status_code=status.HTTP_201_CREATED
+)
+def assign_users_to_companies_bulk(
+    assignments: List[company_schema.CompanyAssignment],
+    db: Session = Depends(get_db)
+    # Proteger este endpoint
+    # current_user: user_model.User = Depends(get_current_active_user)
+):
+    """
+    Asigna varios usuarios a compañías en una sola transacción.
+    Valida usuarios y compañías con una consulta cada uno; si alguna
+    referencia no existe o ya está asignada, no se crea ninguna.
+    """
+    if not assignments:
+        return []
+
+    pairs = [(a.user_id, a.company_id) for a in assignments]
+    duplicated = sorted(pair for pair, n in Counter(pairs).items() if n > 1)
+    if duplicated:
+        raise HTTPException(status_code=400, detail=f"Asignaciones repetidas en la solicitud: {duplicated}")
+
+    user_ids = {a.user_id for a in assignments}
+    missing_users = sorted(user_ids - crud_user.get_existing_user_ids(db, user_ids))
+    if missing_users:
+        raise HTTPException(status_code=404, detail=f"Users not found. Cannot assign: {missing_users}")
+
+    company_ids = {a.company_id for a in assignments}
+    missing_companies = sorted(company_ids - crud_user.get_existing_company_ids(db, company_ids))
+    if missing_companies:
+        raise HTTPException(status_code=404, detail=f"Companies not found. Cannot assign: {missing_companies}")
+
+    already_assigned = sorted(crud_user.get_existing_assignments(db, set(pairs)))
+    if already_assigned:
+        raise HTTPException(status_code=400, detail=f"Usuarios ya asignados a esas compañías: {already_assigned}")
+
+    return crud_user.bulk_assign_users_to_companies(db=db, assignments=assignments)
 
@@ -0,0 +1,113 @@
+# app/core/auth_cache.py
+"""
+Caché de autenticación en memoria (por proceso).
+
+- token_cache: LRU acotado de tokens ya verificados -> email. Cada entrada
+  vive hasta el `exp` del propio token, así que no se vuelve a correr
+  jwt.decode por cada request.
+- user_cache: snapshot (id, email, is_active) por email con TTL corto, para no
+  consultar Postgres en cada request. Se invalida en update_user /
+  delete_user_db; el TTL acota lo que puede tardar en verse un cambio hecho
+  desde otro proceso.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """ Lo que usan las rutas de current_user, sin atarlo a una sesión SQL """
+    id: int
+    email: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, db_user) -> "UserSnapshot":
+        return cls(id=db_user.id, email=db_user.email, is_active=bool(db_user.is_active))
+
+
+# hits / misses de cada caché, para métricas
+stats: Counter = Counter()
+
+
+class _TokenCache:
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                stats["token_misses"] += 1
+                return None
+            email, exp = entry
+            if exp <= time.time():
+                del self._entries[token]
+                stats["token_misses"] += 1
+                return None
+            self._entries.move_to_end(token)
+            stats["token_hits"] += 1
+            return email
+
+    def put(self, token: str, email: str, exp: float) -> None:
+        with self._lock:
+            self._entries[token] = (email, exp)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _UserCache:
+    def __init__(self, ttl_seconds: float):
+        self._ttl = ttl_seconds
+        self._entries: dict[str, tuple[UserSnapshot, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, email: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[1] <= time.monotonic():
+                self._entries.pop(email, None)
+                stats["user_misses"] += 1
+                return None
+            stats["user_hits"] += 1
+            return entry[0]
+
+    def put(self, snapshot: UserSnapshot) -> None:
+        with self._lock:
+            self._entries[snapshot.email] = (snapshot, time.monotonic() + self._ttl)
+
+    def invalidate(self, *emails: str) -> None:
+        with self._lock:
+            for email in emails:
+                self._entries.pop(email, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = _TokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+user_cache = _UserCache(settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(*emails: str) -> None:
+    """ Llamar cuando cambian los datos de un usuario (email, is_active, password) """
+    user_cache.invalidate(*(e for e in emails if e))
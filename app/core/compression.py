@@ -0,0 +1,303 @@
+# app/core/compression.py
+"""
+Compresión negociada de respuestas y caché de respuestas por ETag.
+
+CompressionMiddleware (ASGI puro):
+- Elige la codificación según Accept-Encoding (q-values incluidos), con
+  preferencia br > zstd > gzip. brotli y zstandard son opcionales: si no
+  están instalados solo se ofrece gzip.
+- No comprime bajo COMPRESSION_MINIMUM_SIZE, ni respuestas que ya traen
+  Content-Encoding, ni SSE (text/event-stream, se entregaría con retraso)
+  ni formatos ya comprimidos (parquet, imágenes, zip).
+- Las respuestas en streaming (exportaciones) se comprimen por chunks.
+
+response_cache: LRU acotado por bytes (RESPONSE_CACHE_MAX_BYTES) de las
+respuestas GET 200 con ETag. Guarda el cuerpo sin comprimir y cada variante
+comprimida que se haya pedido:
+- el endpoint, después de calcular el ETag, usa cached_response() para
+  devolver el cuerpo guardado sin volver a armar el payload;
+- el middleware encuentra la variante comprimida en la caché y no gasta CPU
+  en comprimir de nuevo.
+Una entrada es tan fresca como lo que codifica su ETag (ver
+app/core/etag.py): lecturas nuevas, configuración y el borde de la ventana
+redondeado a su granularidad cambian el ETag. Lo que el ETag no ve (p.ej.
+el corrimiento de la ventana dentro de esa granularidad) lo acota un TTL por
+entrada: el endpoint lo fija con set_cache_ttl() según la granularidad del
+rango; si no, RESPONSE_CACHE_TTL_SECONDS.
+"""
+import gzip
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+IDENTITY = "identity"
+
+# Clave en request.state (scope["state"]) con el TTL de la entrada de caché
+_CACHE_TTL_STATE = "response_cache_ttl"
+
+# Tipos que no vale la pena comprimir (o que no deben esperar a un buffer)
+_SKIP_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/vnd.apache.parquet",
+    "application/zip",
+    "application/gzip",
+    "image/",
+    "video/",
+    "audio/",
+)
+
+# hits / misses de la caché de respuestas, para métricas
+stats: Counter = Counter()
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+# Orden = preferencia del servidor ante q-values iguales
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if BROTLI_AVAILABLE:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=5)
+if ZSTD_AVAILABLE:
+    ENCODERS["zstd"] = lambda body: zstandard.ZstdCompressor(level=3).compress(body)
+ENCODERS["gzip"] = _gzip
+
+
+def _stream_encoder(encoding: str) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """ (comprimir chunk, cerrar) para respuestas en streaming """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        return compressor.process, compressor.finish
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        return compressor.compress, compressor.flush
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """ Mejor codificación disponible según Accept-Encoding; None = sin comprimir """
+    if not accept_encoding:
+        return None
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name] = q
+
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in ENCODERS:
+        q = qualities.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _CacheEntry:
+    __slots__ = ("media_type", "bodies", "size", "expires_at")
+
+    def __init__(self, media_type: str, expires_at: float):
+        self.media_type = media_type
+        self.bodies: Dict[str, bytes] = {}
+        self.size = 0
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bytes > 0
+
+    def get(self, etag: str, encoding: str = IDENTITY) -> Optional[Tuple[str, bytes]]:
+        """ (media_type, cuerpo) de la variante pedida, o None """
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[etag]
+                self._size -= entry.size
+                entry = None
+            body = entry.bodies.get(encoding) if entry is not None else None
+            if body is None:
+                stats[f"{encoding}_misses"] += 1
+                return None
+            self._entries.move_to_end(etag)
+            stats[f"{encoding}_hits"] += 1
+            return entry.media_type, body
+
+    def put(self, etag: str, media_type: str, encoding: str, body: bytes, ttl: float) -> None:
+        """ `ttl` solo cuenta al crear la entrada; las variantes agregadas después la heredan """
+        if not self.enabled or len(body) > self._max_bytes:
+            return
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                entry = self._entries[etag] = _CacheEntry(media_type, time.monotonic() + ttl)
+            elif encoding in entry.bodies:
+                return
+            entry.bodies[encoding] = body
+            entry.size += len(body)
+            self._size += len(body)
+            self._entries.move_to_end(etag)
+            while self._size > self._max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+def set_cache_ttl(request: Request, seconds: float) -> None:
+    """ TTL de la entrada que se guarde para esta respuesta (p.ej. la granularidad del rango) """
+    setattr(request.state, _CACHE_TTL_STATE, seconds)
+
+
+def cached_response(etag: str) -> Optional[Response]:
+    """ Respuesta ya armada para este ETag (sin comprimir; el middleware elige la variante) """
+    if not response_cache.enabled:
+        return None
+    cached = response_cache.get(etag)
+    if cached is None:
+        return None
+    media_type, body = cached
+    return Response(content=body, media_type=media_type, headers={"ETag": etag})
+
+
+def _skip(headers: MutableHeaders, status: int) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return True
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(_SKIP_CONTENT_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        cacheable = scope["method"] == "GET" and response_cache.enabled
+        if encoding is None and not cacheable:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        stream_compress = stream_finish = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough, stream_compress, stream_finish
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream_compress is not None:
+                # Chunks siguientes de una respuesta en streaming
+                chunk = stream_compress(body) if body else b""
+                if not more_body:
+                    chunk += stream_finish()
+                if chunk or not more_body:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            if _skip(headers, start_message["status"]):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if more_body:
+                # Streaming: no se conoce el tamaño total, se comprime por chunks
+                if encoding is None:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                stream_compress, stream_finish = _stream_encoder(encoding)
+                del headers["content-length"]
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                chunk = stream_compress(body) if body else b""
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                return
+
+            # Cuerpo completo en un solo mensaje (JSONResponse y similares)
+            etag = headers.get("etag")
+            cache_this = cacheable and etag is not None and start_message["status"] == 200
+            media_type = headers.get("content-type", "")
+            ttl = scope.get("state", {}).get(_CACHE_TTL_STATE, settings.RESPONSE_CACHE_TTL_SECONDS)
+            if cache_this:
+                response_cache.put(etag, media_type, IDENTITY, body, ttl)
+
+            if len(body) >= self.minimum_size:
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is not None:
+                    cached = response_cache.get(etag, encoding) if cache_this else None
+                    if cached is not None:
+                        body = cached[1]
+                    else:
+                        body = ENCODERS[encoding](body)
+                        if cache_this:
+                            response_cache.put(etag, media_type, encoding, body, ttl)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -10,11 +10,71 @@ class Settings(BaseSettings):
     #combustible
     MONGO_FUEL_DB_NAME: str        
     MONGO_COLLECTION_NAME2: str
+
+    # Crear/verificar índices de Mongo al conectar
+    MONGO_ENSURE_INDEXES: bool = False
+
+    # Registro de consultas lentas (ver app/db/slow_queries.py)
+    MONGO_SLOW_QUERY_MS: int = 500
+    MONGO_SLOW_QUERY_RING_SIZE: int = 200
+    MONGO_SLOW_QUERY_EXPLAIN: bool = True
     
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 43200
+
+    # bcrypt: costo y pool dedicado (ver app/core/security.py)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Caché de tokens verificados y de usuarios (ver app/core/auth_cache.py)
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+
+    # Margen de llegada de lecturas a Mongo para el cursor de `since` (ver app/core/pagination.py)
+    SYNC_INGESTION_LAG_SECONDS: int = 120
+
+    #exportación de historial crudo
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Lecturas en vivo por SSE (ver app/core/live_stream.py)
+    LIVE_USE_CHANGE_STREAMS: bool = True
+    LIVE_POLL_INTERVAL_SECONDS: float = 2.0
+    LIVE_POLL_BATCH_SIZE: int = 1000
+    LIVE_QUEUE_SIZE: int = 256
+    LIVE_HEARTBEAT_SECONDS: float = 15.0
+    LIVE_RETRY_MS: int = 5000
+    # Cada cuánto se re-valida al usuario de un stream abierto (activo, empresas)
+    LIVE_AUTH_RECHECK_SECONDS: float = 60.0
+
+    # Máximo de idas y vueltas (SQL + Mongo) por request antes de loguearlo; 0 = desactivado
+    REQUEST_ROUNDTRIP_BUDGET: int = 0
+
+    # Monitor de lag del event loop (ver app/core/loop_monitor.py)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: int = 250
+    # Modo debug: capturar el stack de lo que bloquea el loop más de N ms
+    LOOP_BLOCK_DEBUG: bool = False
+    LOOP_BLOCK_THRESHOLD_MS: int = 100
+    LOOP_BLOCK_RING_SIZE: int = 50
+
+    # Profiling opt-in (ver app/core/profiling.py); vacío = desactivado
+    PROFILING_ENABLED: bool = False
+    PROFILE_OUTPUT_DIR: str = ""
+
+    # Granularidad del borde de la ventana en el ETag del summary (rangos crudos)
+    SUMMARY_WINDOW_STEP_SECONDS: int = 60
+
+    # Compresión de respuestas y caché por ETag (ver app/core/compression.py)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    # 0 = sin caché de respuestas
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # TTL de una entrada si el endpoint no fija otro (set_cache_ttl)
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,74 @@
+# app/core/etag.py
+"""
+ETag / If-None-Match para las respuestas de energía (summary y details).
+
+El ETag se arma con lo que determina el contenido:
+- el timestamp de la lectura más nueva de cada dispositivo. Con
+  latest_reading_times() es una consulta por dispositivo cubierta por el
+  índice (devEui, time), sin tocar los documentos; el summary en cambio lo
+  toma del último documento, que igual necesita para armar la respuesta;
+- las "versiones" de configuración que entran en la respuesta (price_kwh,
+  nombre / centro del dispositivo, parámetros del request);
+- el borde de la ventana de tiempo, redondeado (el día local en details, el
+  bucket o el paso de SUMMARY_WINDOW_STEP_SECONDS en el summary): sin él un
+  dispositivo que deja de reportar tendría el mismo ETag para siempre.
+
+Si coincide con If-None-Match se responde 304 sin construir el payload.
+Los ETag son débiles (W/): dos respuestas con el mismo ETag son
+equivalentes, aunque la ventana se haya corrido menos que su granularidad.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional
+
+import pymongo
+from fastapi import Request, Response
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.db import slow_queries
+
+
+def make_etag(*parts: Any) -> str:
+    raw = json.dumps(parts, separators=(",", ":"), sort_keys=True, default=str).encode("utf-8")
+    return f'W/"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """ Comparación débil contra If-None-Match (lista separada por comas o *) """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(candidate) for candidate in header.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+async def latest_reading_times(
+    collection: AsyncIOMotorCollection,
+    dev_euis: Iterable[str]
+) -> Dict[str, Optional[datetime.datetime]]:
+    """
+    Timestamp de la lectura más nueva por dispositivo. Filtra y proyecta solo
+    campos del índice (devEui, time), así que Mongo no lee documentos.
+    """
+    async def _latest(dev_eui: str):
+        doc = await slow_queries.find_one(
+            collection,
+            {"deviceInfo.devEui": dev_eui},
+            projection={"_id": 0, "time": 1},
+            sort=[("time", pymongo.DESCENDING)]
+        )
+        return dev_eui, doc["time"] if doc else None
+
+    return dict(await asyncio.gather(*(_latest(eui) for eui in dev_euis)))
@@ -0,0 +1,136 @@
+# app/core/fuel_parser.py
+"""
+Parser liviano para los documentos de combustible de Mongo.
+
+Evita construir modelos Pydantic por cada uplink (MongoFuelDoc y los
+FuelTank / FuelSensorData de cada tanque): lee solo los campos necesarios
+(ver FUEL_PROJECTION) y arma los tanques como dicts con la forma de FuelTank.
+El endpoint arma cada centro también como dict y FastAPI lo valida una sola
+vez contra response_model (FuelCenter).
+Los fallos de parseo se cuentan en `parse_stats` en vez de imprimirse por
+stdout.
+"""
+import datetime
+from collections import Counter
+from typing import List
+
+# (sufijo, nombre, capacidad, tipo, campo volumen, campo %, campo presión, campo ok)
+FUEL_TANK_SLOTS = (
+    ("S0", "Tanque S0 (Diesel)", 10000, "Diesel",
+     "volume_L_S0", "percentage_S0", "pressure_Bar_S0", "sensor_0_ok"),
+    ("S1", "Tanque S1 (Gasolina)", 15000, "Gasolina",
+     "volume_L_S1", "percentage_S1", "pressure_Bar_S1", "sensor_1_ok"),
+    ("S2", "Tanque S2 (Biodiesel)", 8000, "Biodiesel",
+     "volume_L_S2", "percentage_S2", "pressure_Bar_S2", "sensor_2_ok"),
+)
+
+# Proyección para Mongo: solo lo que usa el parser
+FUEL_PROJECTION = {"_id": 0, "time": 1, "rxInfo.location": 1}
+for _slot in FUEL_TANK_SLOTS:
+    for _field in _slot[4:]:
+        FUEL_PROJECTION[f"object.{_field}"] = 1
+
+# Contadores de resultado: "ok", "missing_object", "bad_time", "bad_value";
+# el endpoint suma "no_devices" (centro sin dispositivos) y "no_reading"
+# (EUI sin documentos en Mongo)
+parse_stats: Counter = Counter()
+
+
+class FuelParseError(ValueError):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _as_float(value) -> float:
+    """ Igual que el modelo Pydantic: None -> 0, numéricos y strings numéricos -> float """
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    raise FuelParseError("bad_value")
+
+
+_TRUE_STRINGS = {"true", "1", "yes", "on", "t", "y"}
+_FALSE_STRINGS = {"false", "0", "no", "off", "f", "n"}
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in _TRUE_STRINGS:
+            return True
+        if lowered in _FALSE_STRINGS:
+            return False
+    raise FuelParseError("bad_value")
+
+
+def _as_time(value) -> datetime.datetime:
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+    raise FuelParseError("bad_time")
+
+
+def _location(doc: dict) -> tuple[float, float]:
+    rx_info = doc.get("rxInfo")
+    if not rx_info or not isinstance(rx_info, list):
+        return 0.0, 0.0
+    location = rx_info[0].get("location") if isinstance(rx_info[0], dict) else None
+    if not isinstance(location, dict):
+        return 0.0, 0.0
+    return _as_float(location.get("latitude", 0.0)), _as_float(location.get("longitude", 0.0))
+
+
+def parse_fuel_tanks(dev_eui: str, mongo_doc: dict, center_id_str: str) -> List[dict]:
+    """
+    Transforma 1 documento de Mongo (con S0, S1, S2) en 3 tanques (dicts con
+    la forma de FuelTank).
+    Si el documento no se puede parsear devuelve [] y suma el motivo en parse_stats.
+    """
+    try:
+        obj = mongo_doc.get("object")
+        if not isinstance(obj, dict):
+            raise FuelParseError("missing_object")
+
+        last_update_iso = _as_time(mongo_doc.get("time")).isoformat()
+        lat, lon = _location(mongo_doc)
+
+        tanks = [
+            {
+                "id": f"{dev_eui}-{suffix}",
+                "name": name,
+                "capacity": capacity,
+                "fuelType": fuel_type,
+                "sensor": {
+                    "volume_L": _as_float(obj.get(vol_f)),
+                    "percentage": _as_float(obj.get(pct_f)),
+                    "pressure_Bar": _as_float(obj.get(pres_f)),
+                    "sensor_ok": _as_bool(obj.get(ok_f, False)),
+                    "lastUpdate": last_update_iso,
+                    "latitude": lat,
+                    "longitude": lon,
+                },
+                "centerId": center_id_str,
+            }
+            for suffix, name, capacity, fuel_type, vol_f, pct_f, pres_f, ok_f in FUEL_TANK_SLOTS
+        ]
+    except FuelParseError as e:
+        parse_stats[e.reason] += 1
+        return []
+
+    parse_stats["ok"] += 1
+    return tanks
@@ -0,0 +1,262 @@
+# app/core/history_export.py
+"""
+Exportación en streaming del historial crudo (sin agregar) de dispositivos.
+
+Lee Mongo con un cursor de `batch_size` acotado y escribe cada lote apenas
+llega (CSV, NDJSON o Parquet), así que la memoria no depende del rango pedido
+y la respuesta empieza a enviarse de inmediato.
+"""
+import csv
+import datetime
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator, Iterable, List, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.models.device import DeviceType
+from app.schemas.energy import EnergyObject
+from app.schemas.fuel import MongoFuelObject
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional: requiere pyarrow
+    pa = None
+    pq = None
+
+PARQUET_AVAILABLE = pa is not None
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv",
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+# Campos de 'object' que se exportan por tipo de dispositivo
+EXPORT_FIELDS = {
+    DeviceType.energia: list(EnergyObject.model_fields),
+    DeviceType.combustible: list(MongoFuelObject.model_fields),
+}
+
+BASE_COLUMNS = ["time", "devEui", "type"]
+
+# Columnas booleanas (sensor_X_ok); el resto de 'object' es numérico
+_BOOL_FIELDS = {
+    name
+    for model in (EnergyObject, MongoFuelObject)
+    for name, info in model.model_fields.items()
+    if info.annotation is bool
+}
+
+# Una fuente = (colección, dev_eui, tipo)
+ExportSource = Tuple[AsyncIOMotorCollection, str, DeviceType]
+
+
+def export_columns(device_types: Iterable[DeviceType]) -> List[str]:
+    """ Columnas fijas + unión (en orden) de los campos de los tipos pedidos """
+    columns = list(BASE_COLUMNS)
+    for device_type in DeviceType:
+        if device_type in device_types:
+            columns.extend(f for f in EXPORT_FIELDS[device_type] if f not in columns)
+    return columns
+
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+async def _iter_raw_batches(
+    collection: AsyncIOMotorCollection,
+    dev_eui: str,
+    device_type: DeviceType,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    batch_size: int
+) -> AsyncIterator[List[dict]]:
+    fields = EXPORT_FIELDS[device_type]
+    projection = {"_id": 0, "time": 1}
+    for field in fields:
+        projection[f"object.{field}"] = 1
+
+    cursor = collection.find(
+        {
+            "deviceInfo.devEui": dev_eui,
+            "time": {"$gte": start_date, "$lte": end_date},
+            "object": {"$type": "object"}
+        },
+        projection=projection,
+        batch_size=batch_size
+    ).sort("time", 1)
+
+    batch = []
+    async for doc in cursor:
+        obj = doc.get("object") or {}
+        row = {"time": _as_utc(doc["time"]), "devEui": dev_eui, "type": device_type.value}
+        for field in fields:
+            row[field] = obj.get(field)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _CsvEncoder:
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=columns, extrasaction="ignore")
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate(0)
+        return data
+
+    def start(self) -> bytes:
+        self._writer.writeheader()
+        return self._drain()
+
+    def encode(self, rows: List[dict]) -> bytes:
+        for row in rows:
+            self._writer.writerow({**row, "time": row["time"].isoformat()})
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _NdjsonEncoder:
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+
+    def start(self) -> bytes:
+        return b""
+
+    def encode(self, rows: List[dict]) -> bytes:
+        lines = [
+            json.dumps({**row, "time": row["time"].isoformat()}, separators=(",", ":"), default=str)
+            for row in rows
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """ Destino solo-escritura para ParquetWriter que entrega lo escrito por partes """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _ParquetEncoder:
+    """ Cada lote se escribe como un row group; el footer sale en finish() """
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.schema = pa.schema(
+            [
+                pa.field("time", pa.timestamp("ms", tz="UTC")),
+                pa.field("devEui", pa.string()),
+                pa.field("type", pa.string()),
+            ]
+            + [
+                pa.field(c, pa.bool_() if c in _BOOL_FIELDS else pa.float64())
+                for c in columns[len(BASE_COLUMNS):]
+            ]
+        )
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema)
+
+    def _coerce(self, column: str, value):
+        if value is None:
+            return None
+        if column in _BOOL_FIELDS:
+            return value if isinstance(value, bool) else None
+        return float(value) if isinstance(value, (int, float)) else None
+
+    def start(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: List[dict]) -> bytes:
+        data = {"time": [], "devEui": [], "type": []}
+        data.update({c: [] for c in self.columns[len(BASE_COLUMNS):]})
+        for row in rows:
+            data["time"].append(row["time"])
+            data["devEui"].append(row["devEui"])
+            data["type"].append(row["type"])
+            for column in self.columns[len(BASE_COLUMNS):]:
+                data[column].append(self._coerce(column, row.get(column)))
+        self._writer.write_table(pa.Table.from_pydict(data, schema=self.schema))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+_ENCODERS = {
+    ExportFormat.csv: _CsvEncoder,
+    ExportFormat.ndjson: _NdjsonEncoder,
+    ExportFormat.parquet: _ParquetEncoder,
+}
+
+
+async def stream_export(
+    sources: List[ExportSource],
+    export_format: ExportFormat,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    batch_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Generador para StreamingResponse: recorre cada dispositivo en orden de
+    tiempo y va entregando los bytes de cada lote.
+    """
+    encoder = _ENCODERS[export_format](export_columns({t for _, _, t in sources}))
+
+    chunk = encoder.start()
+    if chunk:
+        yield chunk
+    for collection, dev_eui, device_type in sources:
+        async for batch in _iter_raw_batches(
+            collection, dev_eui, device_type, start_date, end_date, batch_size
+        ):
+            chunk = encoder.encode(batch)
+            if chunk:
+                yield chunk
+    chunk = encoder.finish()
+    if chunk:
+        yield chunk
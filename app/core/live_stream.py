@@ -0,0 +1,278 @@
+# app/core/live_stream.py
+"""
+Lecturas en vivo para los dashboards (Server-Sent Events).
+
+Un único LiveHub por proceso sigue las colecciones de energía y combustible
+y reparte cada lectura nueva a los suscriptores autorizados para ese
+dispositivo: 500 dashboards abiertos cuestan un solo stream a Mongo.
+
+- Usa change streams si Mongo los soporta (replica set); en un mongod
+  standalone cae a sondear por _id cada LIVE_POLL_INTERVAL_SECONDS.
+- Si el stream se corta, se reabre con el último resume token (o desde el
+  último _id en el sondeo), así no se pierden los inserts del corte. Si
+  Mongo ya no puede retomar desde ese token, se envía "resync" a los
+  suscriptores de ese tipo de dispositivo.
+- Cada lectura se envía como delta: solo los campos de `object` que
+  cambiaron respecto de la lectura anterior del mismo dispositivo. El
+  evento se serializa una sola vez y se comparte entre suscriptores.
+- Al conectarse se envía un evento "snapshot" con el último `object` de
+  cada dispositivo autorizado. Los que el hub todavía no vio (p.ej. justo
+  después de un reinicio) se leen de Mongo, una consulta por dispositivo.
+- Cada suscriptor tiene una cola acotada (LIVE_QUEUE_SIZE). Si se llena (un
+  cliente lento), se descartan lecturas y se le envía un evento "resync"
+  para que vuelva a pedir el summary.
+- El stream se cierra con un evento "close" cuando vence el token y cuando
+  el usuario deja de estar autorizado (se revisa cada
+  LIVE_AUTH_RECHECK_SECONDS): el cliente debe reconectar con un token nuevo.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import pymongo
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.db import mongodb
+
+logger = logging.getLogger(__name__)
+
+LIVE_PROJECTION = {"time": 1, "deviceInfo.devEui": 1, "object": 1}
+
+
+def format_event(event: str, data: dict) -> str:
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _iso(value) -> Optional[str]:
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.isoformat()
+    return value
+
+
+def _collection(device_type: str):
+    if device_type == "combustible":
+        return mongodb.db_fuel[settings.MONGO_COLLECTION_NAME2]
+    return mongodb.db_energy[settings.MONGO_COLLECTION_NAME]
+
+
+class Subscription:
+    def __init__(self, device_types: Dict[str, str]):
+        # dev_eui -> tipo ("energia" / "combustible")
+        self.device_types = dict(device_types)
+        self.dev_euis: Set[str] = set(device_types)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class LiveHub:
+    def __init__(self):
+        self._by_eui: Dict[str, Set[Subscription]] = {}
+        # último object por dispositivo: base de los deltas y de los snapshots
+        self._latest: Dict[str, dict] = {}
+        # por tipo de dispositivo: desde dónde retomar el stream / el sondeo
+        self._resume_tokens: Dict[str, Any] = {}
+        self._poll_ids: Dict[str, Any] = {}
+        self._tasks = []
+
+    @property
+    def subscribers(self) -> int:
+        return len({sub for subs in self._by_eui.values() for sub in subs})
+
+    def subscribe(self, device_types: Dict[str, str]) -> Subscription:
+        if not self._tasks:
+            self.start()
+        sub = Subscription(device_types)
+        for eui in sub.dev_euis:
+            self._by_eui.setdefault(eui, set()).add(sub)
+        return sub
+
+    async def seed(self, sub: Subscription) -> None:
+        """ Carga desde Mongo la última lectura de los dispositivos que el hub aún no vio """
+        async def _load(eui: str):
+            device_type = sub.device_types[eui]
+            doc = await _collection(device_type).find_one(
+                {"deviceInfo.devEui": eui, "object": {"$type": "object"}},
+                projection=LIVE_PROJECTION,
+                sort=[("time", pymongo.DESCENDING)]
+            )
+            # Si mientras tanto llegó una lectura por el stream, esa es más nueva
+            if doc is not None and eui not in self._latest:
+                self._latest[eui] = {
+                    "devEui": eui, "type": device_type,
+                    "time": _iso(doc.get("time")), "object": doc["object"],
+                }
+
+        missing = [eui for eui in sub.dev_euis if eui not in self._latest]
+        await asyncio.gather(*(_load(eui) for eui in missing))
+
+    def snapshot(self, sub: Subscription) -> list:
+        """ Última lectura conocida de cada dispositivo del suscriptor """
+        return [self._latest[eui] for eui in sub.dev_euis if eui in self._latest]
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for eui in sub.dev_euis:
+            subs = self._by_eui.get(eui)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_eui[eui]
+
+    def publish(self, device_type: str, doc: dict) -> None:
+        eui = (doc.get("deviceInfo") or {}).get("devEui")
+        obj = doc.get("object")
+        if not eui or not isinstance(obj, dict):
+            return
+
+        previous = self._latest.get(eui)
+        time_str = _iso(doc.get("time"))
+        self._latest[eui] = {"devEui": eui, "type": device_type, "time": time_str, "object": obj}
+
+        subs = self._by_eui.get(eui)
+        if not subs:
+            return
+        if previous is None:
+            changes = obj
+        else:
+            old = previous["object"]
+            changes = {key: value for key, value in obj.items() if old.get(key) != value}
+        message = format_event("reading", {"devEui": eui, "type": device_type, "time": time_str, "changes": changes})
+        for sub in subs:
+            sub.push(message)
+
+    def resync(self, device_type: str, reason: str) -> None:
+        """ Avisa a los suscriptores con dispositivos de este tipo que pudieron perder lecturas """
+        message = format_event("resync", {"reason": reason})
+        for sub in {sub for subs in self._by_eui.values() for sub in subs}:
+            if device_type in sub.device_types.values():
+                sub.push(message)
+
+    async def _follow(self, device_type: str, collection) -> None:
+        """ Change stream de inserts; si Mongo no lo soporta, sondeo por _id """
+        pipeline = [
+            {"$match": {"operationType": "insert"}},
+            {"$project": {f"fullDocument.{field}": 1 for field in LIVE_PROJECTION}},
+        ]
+        if settings.LIVE_USE_CHANGE_STREAMS:
+            while True:
+                resume_token = self._resume_tokens.get(device_type)
+                try:
+                    async with collection.watch(pipeline, resume_after=resume_token) as stream:
+                        while stream.alive:
+                            change = await stream.try_next()
+                            # El token avanza con cada batch, aunque no traiga inserts
+                            if stream.resume_token is not None:
+                                self._resume_tokens[device_type] = stream.resume_token
+                            if change is not None:
+                                self.publish(device_type, change["fullDocument"])
+                    return
+                except OperationFailure as e:
+                    if resume_token is None:
+                        logger.info("Change streams no disponibles en %s (%s); usando sondeo", collection.full_name, e)
+                        break
+                    # El token ya salió del oplog: los inserts del corte no se pueden recuperar
+                    logger.warning("No se pudo retomar el stream de %s (%s); enviando resync", collection.full_name, e)
+                    del self._resume_tokens[device_type]
+                    self.resync(device_type, "stream_gap")
+        await self._poll(device_type, collection)
+
+    async def _poll(self, device_type: str, collection) -> None:
+        last_id = self._poll_ids.get(device_type)
+        if last_id is None:
+            newest = await collection.find_one({}, projection={"_id": 1}, sort=[("_id", -1)])
+            last_id = newest["_id"] if newest else None
+        while True:
+            await asyncio.sleep(settings.LIVE_POLL_INTERVAL_SECONDS)
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            docs = await collection.find(query, projection=LIVE_PROJECTION)\
+                .sort("_id", 1).limit(settings.LIVE_POLL_BATCH_SIZE).to_list(length=None)
+            for doc in docs:
+                self.publish(device_type, doc)
+                last_id = self._poll_ids[device_type] = doc["_id"]
+
+    async def _run(self, device_type: str, collection_getter) -> None:
+        while True:
+            try:
+                await self._follow(device_type, collection_getter())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Stream en vivo de %s interrumpido; reintentando", device_type)
+            await asyncio.sleep(settings.LIVE_POLL_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run("energia", lambda: _collection("energia"))),
+            asyncio.create_task(self._run("combustible", lambda: _collection("combustible"))),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+live_hub = LiveHub()
+
+
+async def stream_events(
+    device_types: Dict[str, str],
+    expires_at: Optional[float] = None,
+    reauthorize: Optional[Callable[[], Awaitable[Set[str]]]] = None
+):
+    """
+    Generador SSE de un suscriptor. La suscripción se crea al empezar a
+    iterar (si el cliente corta antes, no queda nada colgado) y se elimina
+    al cortar la conexión.
+    - expires_at: `exp` del token (epoch); al llegar se cierra el stream.
+    - reauthorize: devuelve los EUI que el usuario puede ver ahora; si ya no
+      incluye a todos los del stream, se cierra.
+    """
+    sub = live_hub.subscribe(device_types)
+    try:
+        yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+        await live_hub.seed(sub)
+        yield format_event("snapshot", {"devices": live_hub.snapshot(sub)})
+        next_check = time.monotonic() + settings.LIVE_AUTH_RECHECK_SECONDS
+        while True:
+            if expires_at is not None and time.time() >= expires_at:
+                yield format_event("close", {"reason": "token_expired"})
+                return
+            if reauthorize is not None and time.monotonic() >= next_check:
+                if not sub.dev_euis <= await reauthorize():
+                    yield format_event("close", {"reason": "unauthorized"})
+                    return
+                next_check = time.monotonic() + settings.LIVE_AUTH_RECHECK_SECONDS
+            if sub.overflowed:
+                sub.overflowed = False
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                yield format_event("resync", {"reason": "queue_full"})
+
+            timeout = settings.LIVE_HEARTBEAT_SECONDS
+            if expires_at is not None:
+                timeout = min(timeout, max(expires_at - time.time(), 0.0))
+            if reauthorize is not None:
+                timeout = min(timeout, max(next_check - time.monotonic(), 0.0))
+            try:
+                message = await asyncio.wait_for(sub.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                continue
+            yield message
+    finally:
+        live_hub.unsubscribe(sub)
@@ -0,0 +1,118 @@
+# app/core/loop_monitor.py
+"""
+Monitor de lag del event loop.
+
+Varias rutas async hacen I/O síncrono de SQLAlchemy y loops pesados en el
+hilo del loop; mientras tanto ningún otro request avanza.
+
+- Una tarea duerme LOOP_MONITOR_INTERVAL_MS y mide cuánto más tardó en
+  despertar: ese atraso es el lag. Se exporta en /metrics
+  (event_loop_lag_seconds y event_loop_lag_last_seconds).
+- Con LOOP_BLOCK_DEBUG, un hilo watchdog revisa el último latido de esa
+  tarea. Si el loop lleva más de LOOP_BLOCK_THRESHOLD_MS sin latir, captura
+  el stack del hilo del loop (sys._current_frames) y lo deja en `blocks`, que
+  se lee desde GET /api/admin/loop-blocks (y desde los tests).
+"""
+import asyncio
+import datetime
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import REGISTRY, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = REGISTRY.register(Histogram(
+    "event_loop_lag_seconds", "Atraso del event loop respecto del intervalo esperado",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+))
+LOOP_LAG_LAST = REGISTRY.register(Gauge(
+    "event_loop_lag_last_seconds", "Último atraso medido del event loop"
+))
+
+
+class LoopMonitor:
+    def __init__(self, interval_ms: int, block_threshold_ms: Optional[int] = None, ring_size: int = 50):
+        self.interval = interval_ms / 1000
+        # None = sin watchdog (solo métrica)
+        self.block_threshold = block_threshold_ms / 1000 if block_threshold_ms else None
+        self.blocks: deque = deque(maxlen=ring_size)
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._open_block: Optional[dict] = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self._heartbeat = time.monotonic()
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+            block = self._open_block
+            if block is not None:
+                # El bloqueo terminó: registrar su duración total
+                block["blocked_ms"] = round(lag * 1000, 1)
+                self._open_block = None
+
+    def _watch(self):
+        check_every = self.block_threshold / 4
+        while not self._stop.wait(check_every):
+            if self._open_block is not None:
+                continue
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.block_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            block = {
+                "recorded_at": datetime.datetime.now(datetime.timezone.utc),
+                "blocked_ms": round(stalled * 1000, 1),
+                "stack": "".join(traceback.format_stack(frame)),
+            }
+            self._open_block = block
+            self.blocks.append(block)
+            logger.warning("Event loop bloqueado por más de %.0f ms:\n%s", stalled * 1000, block["stack"])
+
+    def start(self) -> None:
+        """ Llamar desde el loop (lifespan) """
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        if self.block_threshold:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._watchdog is not None:
+            # join fuera del loop: el watchdog puede tardar hasta un ciclo de wait en salir
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+loop_monitor = LoopMonitor(
+    settings.LOOP_MONITOR_INTERVAL_MS,
+    block_threshold_ms=settings.LOOP_BLOCK_THRESHOLD_MS if settings.LOOP_BLOCK_DEBUG else None,
+    ring_size=settings.LOOP_BLOCK_RING_SIZE,
+)
@@ -0,0 +1,103 @@
+# app/core/pagination.py
+"""
+Paginación por cursor (keyset) para los listados.
+
+El cursor es opaco para el cliente: codifica los valores de ordenamiento del
+último elemento de la página. La página siguiente filtra "(orden) > cursor"
+(sin OFFSET) y no se desordena con inserciones concurrentes. Cuando el orden
+lo resuelve un índice de una sola tabla (p.ej. id), la página N cuesta lo
+mismo que la primera; si el orden cruza un join, ver el docstring del crud.
+
+El cursor de la página siguiente viaja en el header X-Next-Cursor
+(ausente cuando no hay más páginas).
+
+Sincronización incremental (summary / historial): la respuesta trae en
+X-Sync-Cursor un instante; el cliente lo envía como `since` en el próximo
+refresco y recibe solo lo posterior. Los puntos se filtran por el `time` que
+reporta el dispositivo, y una lectura LoRaWAN llega a Mongo segundos después
+de ese `time`: por eso el cursor es "ahora" menos SYNC_INGESTION_LAG_SECONDS
+(ver sync_horizon). Las lecturas en vuelo durante un refresco quedan después
+del cursor y llegan en el siguiente; a cambio, los puntos de ese margen
+pueden repetirse y el cliente los reemplaza por timestamp.
+"""
+import base64
+import datetime
+import json
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+SYNC_CURSOR_HEADER = "X-Sync-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str, size: int, types: Optional[Sequence[type]] = None) -> List[Any]:
+    """
+    Devuelve los `size` valores del cursor o responde 400 si es inválido.
+    Con `types`, cada valor debe ser de su tipo (un cursor bien formado con
+    valores de otro tipo llegaría a SQL y terminaría en 500).
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if types is not None:
+        for value, expected in zip(values, types):
+            # bool es subclase de int: no vale como id
+            if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+                raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+
+def decode_id_cursor(token: str) -> int:
+    """ Cursor de listados ordenados solo por id """
+    (last_id,) = decode_cursor(token, 1, (int,))
+    return last_id
+
+
+def set_next_cursor(
+    response: Response,
+    items: Sequence[Any],
+    limit: int,
+    key: Callable[[Any], Sequence[Any]]
+) -> None:
+    """ Si la página vino llena, publica el cursor del último elemento """
+    if items and len(items) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
+
+
+def sync_horizon(now: datetime.datetime) -> datetime.datetime:
+    """ Cursor seguro: las lecturas con `time` anterior ya deberían estar en Mongo """
+    return now - datetime.timedelta(seconds=settings.SYNC_INGESTION_LAG_SECONDS)
+
+
+def set_sync_cursor(response: Response, synced_until: datetime.datetime) -> None:
+    response.headers[SYNC_CURSOR_HEADER] = encode_cursor([synced_until.isoformat()])
+
+
+def parse_since(value: str) -> datetime.datetime:
+    """
+    `since` puede ser un timestamp ISO o el cursor de X-Sync-Cursor.
+    Devuelve un datetime con zona (UTC si no traía) o responde 400.
+    """
+    try:
+        since = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        (raw,) = decode_cursor(value, 1, (str,))
+        try:
+            since = datetime.datetime.fromisoformat(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    return since
@@ -0,0 +1,112 @@
+# app/core/profiling.py
+"""
+Profiling opt-in de un request puntual (p.ej. get_energy_summary de un
+tenant con una flota grande), pensado para usarse en producción.
+
+- El middleware solo se instala con PROFILING_ENABLED: desactivado, los
+  requests normales no pasan por aquí.
+- Un request se perfila solo si trae `X-Profile: 1` y su propio Bearer token
+  es de un usuario activo con rol admin (mismo chequeo que
+  get_current_admin_user). Sin eso el header se ignora y el request sigue
+  normal: un admin solo perfila sus propios requests.
+- Usa pyinstrument (opcional), un profiler por muestreo con soporte async.
+- Si PROFILE_OUTPUT_DIR está definido, el reporte HTML se guarda ahí y la
+  respuesta normal lleva su id (opaco) en X-Profile-Report; se descarga con
+  GET /api/admin/profiles/{id}. Si no, la respuesta se reemplaza por el
+  reporte.
+"""
+import os
+import re
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import HTMLResponse
+
+try:
+    from pyinstrument import Profiler
+    PROFILER_AVAILABLE = True
+except ImportError:  # pyinstrument es opcional
+    Profiler = None
+    PROFILER_AVAILABLE = False
+
+PROFILE_HEADER = "x-profile"
+PROFILE_REPORT_HEADER = "X-Profile-Report"
+
+_REPORT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def report_path(output_dir: str, report_id: str) -> Optional[str]:
+    """ Ruta del reporte, o None si el id no tiene el formato esperado """
+    if not _REPORT_ID.match(report_id):
+        return None
+    return os.path.join(output_dir, f"{report_id}.html")
+
+
+def _is_admin_token(token: str) -> bool:
+    # Import local: dependencies importa crud/db, que no deben cargarse al importar el middleware
+    from app.api.dependencies import get_current_user
+    from app.crud import crud_user
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as db:
+        try:
+            user = get_current_user(db=db, token=token)
+        except HTTPException:
+            return False
+        return bool(user.is_active) and crud_user.is_admin(db, user.id)
+
+
+def _write_report(path: str, html: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+class ProfilingMiddleware:
+    """ Middleware ASGI: perfila los requests de admins que traen X-Profile """
+
+    def __init__(self, app, output_dir: str = ""):
+        self.app = app
+        self.output_dir = output_dir
+
+    async def _requested(self, scope) -> bool:
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER, "").strip().lower() not in ("1", "true", "yes"):
+            return False
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        return await run_in_threadpool(_is_admin_token, token.strip())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # La respuesta se retiene hasta tener el reporte (solo en requests perfilados)
+        messages = []
+
+        async def buffer(message):
+            messages.append(message)
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, buffer)
+        finally:
+            profiler.stop()
+        html = profiler.output_html()
+
+        if not self.output_dir:
+            await HTMLResponse(html)(scope, receive, send)
+            return
+
+        report_id = uuid.uuid4().hex
+        await run_in_threadpool(_write_report, report_path(self.output_dir, report_id), html)
+        for message in messages:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_REPORT_HEADER, report_id)
+            await send(message)
@@ -0,0 +1,133 @@
+# app/core/request_timing.py
+"""
+Contabilidad de consultas por request + header Server-Timing.
+
+Por cada request se cuentan las sentencias SQL y los comandos de Mongo
+(con su tiempo) y se responde con:
+
+    Server-Timing: db;dur=12.1;desc="Postgres x3", mongo;dur=40.2;desc="Mongo x9",
+                   app;dur=8.4, total;dur=60.7
+
+"app" es el resto: transformación en Python + serialización de la respuesta.
+Si REQUEST_ROUNDTRIP_BUDGET > 0, los requests que superan esa cantidad de
+idas y vueltas a las bases (SQL + Mongo) se registran en el log, para que un
+N+1 (p.ej. en get_fuel_summary) se vea de inmediato.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from pymongo import monitoring
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.mongo_count = 0
+        self.mongo_seconds = 0.0
+        # Los listeners de Mongo corren en los hilos de Motor
+        self._lock = threading.Lock()
+
+    def add_sql(self, seconds: float) -> None:
+        with self._lock:
+            self.sql_count += 1
+            self.sql_seconds += seconds
+
+    def add_mongo(self, seconds: float) -> None:
+        with self._lock:
+            self.mongo_count += 1
+            self.mongo_seconds += seconds
+
+    @property
+    def roundtrips(self) -> int:
+        return self.sql_count + self.mongo_count
+
+    def server_timing(self) -> str:
+        total_ms = (time.perf_counter() - self.start) * 1000
+        sql_ms = self.sql_seconds * 1000
+        mongo_ms = self.mongo_seconds * 1000
+        app_ms = max(total_ms - sql_ms - mongo_ms, 0.0)
+        return ", ".join([
+            f'db;dur={sql_ms:.1f};desc="Postgres x{self.sql_count}"',
+            f'mongo;dur={mongo_ms:.1f};desc="Mongo x{self.mongo_count}"',
+            f"app;dur={app_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _current_timing.get()
+
+
+def install_sql_timing(engine) -> None:
+    """ Cuenta y mide cada sentencia SQL del engine dentro del request actual """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("request_timing_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["request_timing_start"].pop()
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.add_sql(time.perf_counter() - started)
+
+
+class MongoCommandTiming(monitoring.CommandListener):
+    """ Suma cada comando de Mongo al request en curso (Motor propaga el contexto) """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.add_mongo(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+class ServerTimingMiddleware:
+    """ Middleware ASGI: agrega Server-Timing y aplica el presupuesto de idas y vueltas """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", timing.server_timing())
+                budget = settings.REQUEST_ROUNDTRIP_BUDGET
+                if budget and timing.roundtrips > budget:
+                    logger.warning(
+                        "Presupuesto de consultas excedido en %s %s: %d SQL + %d Mongo (presupuesto %d)",
+                        scope["method"], scope["path"], timing.sql_count, timing.mongo_count, budget
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timing.reset(token)
@@ -1,15 +1,91 @@
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# El costo de bcrypt es configurable; los hashes con otro costo se
+# re-generan al hacer login (ver verify_and_update_password). needs_update
+# marca un hash solo si su costo cae fuera de min_rounds / max_rounds: se
+# fijan explícitamente en vez de depender de que `rounds` los implique.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+class PasswordPoolBusy(Exception):
+    """ La cola de bcrypt está llena: el login debe reintentarse más tarde """
+
+
+class _PasswordPool:
+    """
+    Pool dedicado y acotado para bcrypt, separado del threadpool por defecto
+    que atiende las rutas sync (listados, CRUD). bcrypt libera el GIL, así que
+    hilos alcanzan para usar varios núcleos.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats: Counter = Counter()
+
+    def submit(self, fn, *args, bounded: bool = True) -> Future:
+        with self._lock:
+            if bounded and self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise PasswordPoolBusy()
+            self._pending += 1
+            self.stats["submitted"] += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.stats["completed"] += 1
+
+    def snapshot(self) -> dict:
+        """ Estado actual para métricas: en ejecución, en cola y contadores """
+        with self._lock:
+            pending = self._pending
+            return {
+                "workers": self.workers,
+                "in_flight": pending,
+                "queued": max(pending - self.workers, 0),
+                "max_pending": self.max_pending,
+                **self.stats,
+            }
+
+
+password_pool = _PasswordPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_pool.submit(pwd_context.verify, plain_password, hashed_password).result()
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verifica en el pool de bcrypt sin bloquear el event loop.
+    Devuelve (ok, nuevo_hash): nuevo_hash viene cuando el hash guardado usa
+    un costo/esquema desactualizado y hay que reemplazarlo.
+    Lanza PasswordPoolBusy si la cola está llena.
+    """
+    future = password_pool.submit(pwd_context.verify_and_update, plain_password, hashed_password)
+    return await asyncio.wrap_future(future)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_pool.submit(pwd_context.hash, password, bounded=False).result()
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
@@ -30,4 +106,4 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None) ->
     
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
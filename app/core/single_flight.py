@@ -0,0 +1,54 @@
+# app/core/single_flight.py
+"""
+Single-flight: coalescencia de cálculos idénticos concurrentes (por proceso).
+
+Cuando empieza un turno, decenas de usuarios de la misma empresa abren el
+dashboard a la vez y piden exactamente el mismo summary. Con
+SingleFlight.run(key, factory) el primer request lanza el cálculo y los que
+llegan con la misma clave mientras está en curso esperan esa misma tarea en
+lugar de repetir las agregaciones en Mongo.
+
+- La clave debe identificar la consulta normalizada y el alcance del tenant;
+  los endpoints de energía usan el ETag, que ya incluye ambos (parámetros,
+  dispositivos visibles para el usuario) y además la versión de los datos.
+- La tarea compartida se espera con asyncio.shield: si un cliente se
+  desconecta, su cancelación no corta el cálculo de los demás.
+- Un error se propaga a todos los que esperaban; la clave se libera al
+  terminar, así que el siguiente request vuelve a intentar.
+- No es una caché: terminado el cálculo, la clave se libera.
+"""
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# cálculos lanzados / requests que se sumaron a uno en curso, por nombre, para métricas
+stats: Counter = Counter()
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            stats[f"{self.name}_leader"] += 1
+        else:
+            stats[f"{self.name}_shared"] += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Si todos los que esperaban se cancelaron, evita el aviso de excepción no recuperada
+        if not task.cancelled():
+            task.exception()
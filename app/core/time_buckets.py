@@ -0,0 +1,110 @@
+# app/core/time_buckets.py
+"""
+Buckets de tiempo de ancho fijo alineados a la hora local de Chile.
+
+Reemplaza $bucketAuto: el ancho del bucket depende solo del rango pedido
+(no de la densidad de datos), así que los gráficos de distintos dispositivos
+quedan alineados y el resultado se puede cachear. $dateTrunc con timezone
+respeta los cambios de horario (DST) de America/Santiago.
+"""
+import datetime
+from zoneinfo import ZoneInfo
+
+BUCKET_TIMEZONE = "America/Santiago"
+_BUCKET_TZ = ZoneInfo(BUCKET_TIMEZONE)
+
+# (binSize, unit) ordenados de menor a mayor ancho.
+# Los tamaños dividen exacto a la hora / al día para que el corte coincida
+# con la hora "redonda" local.
+BUCKET_STEPS = (
+    (1, "minute"),
+    (5, "minute"),
+    (15, "minute"),
+    (30, "minute"),
+    (1, "hour"),
+    (3, "hour"),
+    (6, "hour"),
+    (12, "hour"),
+    (1, "day"),
+)
+
+_UNIT_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+def bucket_seconds(bin_size: int, unit: str) -> int:
+    return bin_size * _UNIT_SECONDS[unit]
+
+
+def bucket_count(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    bin_size: int,
+    unit: str
+) -> float:
+    """ Cantidad aproximada de buckets de (bin_size, unit) en el rango """
+    # Fechas sin zona se asumen UTC (como las guarda Mongo)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=datetime.timezone.utc)
+    range_seconds = max((end - start).total_seconds(), 0)
+    return range_seconds / bucket_seconds(bin_size, unit)
+
+
+def choose_bucket(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    max_buckets: int
+) -> tuple[int, str]:
+    """
+    Elige el bucket más fino que no supere `max_buckets` para el rango dado.
+    Si ninguno alcanza, devuelve el más ancho (1 día).
+    """
+    for bin_size, unit in BUCKET_STEPS:
+        if bucket_count(start, end, bin_size, unit) <= max_buckets:
+            return bin_size, unit
+    return BUCKET_STEPS[-1]
+
+
+def date_trunc_expr(bin_size: int, unit: str, date_field: str = "$time") -> dict:
+    """ Expresión $dateTrunc para usar como _id de un $group """
+    return {
+        "$dateTrunc": {
+            "date": date_field,
+            "unit": unit,
+            "binSize": bin_size,
+            "timezone": BUCKET_TIMEZONE,
+        }
+    }
+
+
+def bucket_floor(value: datetime.datetime, bin_size: int, unit: str) -> datetime.datetime:
+    """
+    Inicio (UTC) del bucket que contiene `value`, igual que date_trunc_expr:
+    los BUCKET_STEPS dividen exacto a la hora / al día, así que basta con
+    truncar la hora local.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    local = value.astimezone(_BUCKET_TZ).replace(second=0, microsecond=0)
+    if unit == "minute":
+        local = local.replace(minute=local.minute - local.minute % bin_size)
+    elif unit == "hour":
+        local = local.replace(hour=local.hour - local.hour % bin_size, minute=0)
+    else:
+        local = local.replace(hour=0, minute=0)
+    return local.astimezone(datetime.timezone.utc)
+
+
+def bucket_label(bin_size: int, unit: str) -> str:
+    """ Ej: (15, "minute") -> "15m", (1, "day") -> "1d" """
+    return f"{bin_size}{unit[0]}"
+
+
+def parse_bucket_label(label: str) -> tuple[int, str]:
+    """ Inverso de bucket_label: "15m" -> (15, "minute"). Solo acepta BUCKET_STEPS. """
+    for bin_size, unit in BUCKET_STEPS:
+        if bucket_label(bin_size, unit) == label:
+            return bin_size, unit
+    valid = ", ".join(bucket_label(b, u) for b, u in BUCKET_STEPS)
+    raise ValueError(f"Resolución inválida '{label}'. Valores permitidos: auto, {valid}")
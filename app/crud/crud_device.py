@@ -1,5 +1,6 @@
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.orm import Session
-from app.models import device, center, company
+from app.models import device, center, company, association
 from app.schemas import device as device_schema
 from typing import List, Any # <-- Importar Any
 
@@ -10,11 +11,49 @@ def get_device_by_eui(db: Session, dev_eui: str) -> device.Device | None:
     return db.query(device.Device).filter(device.Device.dev_eui == dev_eui).first()
 
 
-def get_devices(db: Session, skip: int = 0, limit: int = 100) -> List[device.Device]:
+def get_devices_by_euis_for_user(db: Session, dev_euis: List[str], user_id: int) -> List[device.Device]:
     """
-    Obtiene todos los dispositivos de la base de datos.
+    Obtiene, en UNA consulta, los dispositivos de la lista que pertenecen
+    a alguna compañía del usuario. Los EUI sin permiso simplemente no vuelven.
     """
-    return db.query(device.Device).offset(skip).limit(limit).all()
+    allowed_company_ids = (
+        select(association.UserCompany.company_id)
+        .where(association.UserCompany.user_id == user_id)
+    )
+    return (
+        db.query(device.Device)
+        .join(center.Center)
+        .filter(
+            device.Device.dev_eui.in_(dev_euis),
+            center.Center.company_id.in_(allowed_company_ids)
+        )
+        .all()
+    )
+
+def get_device_euis_for_user(db: Session, user_id: int) -> List[Any]:
+    """ (dev_eui, type) de todos los dispositivos de las compañías del usuario """
+    allowed_company_ids = (
+        select(association.UserCompany.company_id)
+        .where(association.UserCompany.user_id == user_id)
+    )
+    return (
+        db.query(device.Device.dev_eui, device.Device.type)
+        .join(center.Center)
+        .filter(center.Center.company_id.in_(allowed_company_ids))
+        .all()
+    )
+
+def get_devices(
+    db: Session, skip: int = 0, limit: int = 100, after_id: int | None = None
+) -> List[device.Device]:
+    """
+    Obtiene todos los dispositivos de la base de datos, ordenados por id.
+    Con `after_id` pagina por keyset (id > after_id) en vez de OFFSET.
+    """
+    query = db.query(device.Device).order_by(device.Device.id)
+    if after_id is not None:
+        return query.filter(device.Device.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def get_devices_by_company(db: Session, company_id: int, skip: int = 0, limit: int = 100) -> list[device.Device]:
     """
@@ -34,6 +73,42 @@ def get_devices_by_center(db: Session, center_id: int, skip: int = 0, limit: int
              .filter(device.Device.center_id == center_id)\
              .offset(skip).limit(limit).all() 
 
+def get_existing_euis(db: Session, dev_euis: List[str]) -> set[str]:
+    """EUIs de la lista que ya están registrados (una sola consulta)."""
+    if not dev_euis:
+        return set()
+    rows = db.query(device.Device.dev_eui).filter(device.Device.dev_eui.in_(dev_euis)).all()
+    return {row.dev_eui for row in rows}
+
+def get_existing_center_ids(db: Session, center_ids: set[int]) -> set[int]:
+    """IDs de la lista que corresponden a centros existentes (una sola consulta)."""
+    if not center_ids:
+        return set()
+    rows = db.query(center.Center.id).filter(center.Center.id.in_(center_ids)).all()
+    return {row.id for row in rows}
+
+def bulk_create_devices(
+    db: Session, devices_data: List[device_schema.DeviceCreate], batch_size: int = 1000
+) -> dict[str, int]:
+    """
+    Inserta todos los dispositivos en UNA transacción, con INSERT multi-fila
+    por lotes de `batch_size`. Devuelve {dev_eui: id}.
+    """
+    created_ids = {}
+    try:
+        for i in range(0, len(devices_data), batch_size):
+            chunk = [d.model_dump() for d in devices_data[i:i + batch_size]]
+            result = db.execute(
+                insert(device.Device).returning(device.Device.id, device.Device.dev_eui),
+                chunk
+            )
+            created_ids.update({row.dev_eui: row.id for row in result})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return created_ids
+
 def create_device(db: Session, device_data: device_schema.DeviceCreate) -> device.Device:
     db_device = device.Device(**device_data.model_dump())
     db.add(db_device)
@@ -67,12 +142,26 @@ def delete_device(db: Session, device_id: int) -> device.Device | None:
 
 
 #estadisticas1
-def get_devices_with_details(db: Session, skip: int = 0, limit: int = 100) -> List[dict[str, Any]]:
+def get_devices_with_details(
+    db: Session, skip: int = 0, limit: int = 100, after: list | None = None
+) -> List[dict[str, Any]]:
     """
     Obtiene todos los dispositivos con los nombres de su centro y compañía.
-   
+    Orden: compañía, centro, dispositivo (y id para desempatar).
+    Con `after` = [company_name, center_name, name, id] pagina por keyset.
+
+    Limitación: el orden cruza tres tablas, así que ningún índice lo resuelve
+    y cada página sigue haciendo el join y el sort de toda la flota. El
+    keyset evita el OFFSET (leer y descartar las páginas anteriores) y los
+    saltos con inserciones concurrentes, pero la página N no cuesta lo mismo
+    que la primera. Para eso habría que paginar por una clave de una sola
+    tabla (Device.id), cambiando el orden de la tabla de estadísticas.
+    Los índices de la migración 3b7d2c91e4a5 no cambian esto
+    (explain_sql_plans lo muestra como sort conocido).
+    TODO: clave de orden desnormalizada en devices (compañía, centro, nombre)
+    con su índice, o paginar por Device.id.
     """
-    results = (
+    query = (
         db.query(
             device.Device.id,
             device.Device.name,
@@ -86,9 +175,13 @@ def get_devices_with_details(db: Session, skip: int = 0, limit: int = 100) -> Li
         )
         .join(center.Center, device.Device.center_id == center.Center.id)
         .join(company.Company, center.Center.company_id == company.Company.id)
-        .order_by(company.Company.name, center.Center.name, device.Device.name)
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .order_by(company.Company.name, center.Center.name, device.Device.name, device.Device.id)
     )
+    if after is not None:
+        results = query.filter(
+            tuple_(company.Company.name, center.Center.name, device.Device.name, device.Device.id)
+            > tuple_(*after)
+        ).limit(limit).all()
+    else:
+        results = query.offset(skip).limit(limit).all()
     return [result._asdict() for result in results]
\ No newline at end of file
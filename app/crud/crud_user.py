@@ -1,7 +1,9 @@
-from sqlalchemy.orm import Session, joinedload
-from app.models import user, company, association, center
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session, selectinload
+from app.models import user, company, association, center, device
 from app.schemas import user as user_schema, company as company_schema, center as center_schema
 from app.core.security import get_password_hash
+from app.core import auth_cache
 from typing import List
 
 def get_user_by_email(db: Session, email: str) -> user.User | None:
@@ -36,14 +38,74 @@ def assign_user_to_company(db: Session, assignment: company_schema.CompanyAssign
 
 
 
+def is_admin(db: Session, user_id: int) -> bool:
+    """ True si el usuario es admin en al menos una empresa """
+    return db.query(
+        db.query(association.UserCompany).filter(
+            association.UserCompany.user_id == user_id,
+            association.UserCompany.role == association.UserRole.admin
+        ).exists()
+    ).scalar()
+
+def get_existing_user_ids(db: Session, user_ids: set[int]) -> set[int]:
+    """IDs de la lista que corresponden a usuarios existentes (una sola consulta)."""
+    if not user_ids:
+        return set()
+    return {row.id for row in db.query(user.User.id).filter(user.User.id.in_(user_ids)).all()}
+
+def get_existing_company_ids(db: Session, company_ids: set[int]) -> set[int]:
+    """IDs de la lista que corresponden a compañías existentes (una sola consulta)."""
+    if not company_ids:
+        return set()
+    return {row.id for row in db.query(company.Company.id).filter(company.Company.id.in_(company_ids)).all()}
+
+def get_existing_assignments(db: Session, pairs: set[tuple[int, int]]) -> set[tuple[int, int]]:
+    """Pares (user_id, company_id) de la lista que ya están asignados."""
+    if not pairs:
+        return set()
+    rows = (
+        db.query(association.UserCompany.user_id, association.UserCompany.company_id)
+        .filter(tuple_(association.UserCompany.user_id, association.UserCompany.company_id).in_(pairs))
+        .all()
+    )
+    return {(row.user_id, row.company_id) for row in rows}
+
+def bulk_assign_users_to_companies(
+    db: Session, assignments: List[company_schema.CompanyAssignment]
+) -> List[dict]:
+    """
+    Inserta todas las asignaciones en una transacción (INSERT multi-fila).
+    Devuelve las filas creadas sin hacer refresh por fila.
+    """
+    try:
+        result = db.execute(
+            insert(association.UserCompany).returning(
+                association.UserCompany.user_id,
+                association.UserCompany.company_id,
+                association.UserCompany.role
+            ),
+            [a.model_dump() for a in assignments]
+        )
+        created = [row._asdict() for row in result]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return created
+
 #users nuevo
 def get_user_by_id(db: Session, user_id: int) -> user.User | None:
     """Obtiene un usuario por su ID."""
     return db.query(user.User).filter(user.User.id == user_id).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[user.User]:
-    """Obtiene una lista de usuarios con paginación."""
-    return db.query(user.User).offset(skip).limit(limit).all()
+def get_users(
+    db: Session, skip: int = 0, limit: int = 100, after_id: int | None = None
+) -> List[user.User]:
+    """Obtiene una lista de usuarios con paginación (OFFSET o keyset con `after_id`)."""
+    query = db.query(user.User).order_by(user.User.id)
+    if after_id is not None:
+        return query.filter(user.User.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def update_user(
     db: Session, 
@@ -56,6 +118,7 @@ def update_user(
     """
     # Convierte el schema Pydantic a un dict, excluyendo campos no enviados
     update_data = user_in.model_dump(exclude_unset=True)
+    previous_email = db_user.email
 
     # Si se envió 'password', hashearlo antes de guardarlo
     if "password" in update_data:
@@ -70,6 +133,15 @@ def update_user(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    auth_cache.invalidate_user(previous_email, db_user.email)
+    return db_user
+
+def update_password_hash(db: Session, db_user: user.User, hashed_password: str) -> user.User:
+    """Reemplaza el hash guardado (p.ej. al subir el costo de bcrypt)."""
+    db_user.hashed_password = hashed_password
+    db.add(db_user)
+    db.commit()
+    auth_cache.invalidate_user(db_user.email)
     return db_user
 
 def delete_user_db(db: Session, user_id: int) -> user.User | None:
@@ -78,8 +150,10 @@ def delete_user_db(db: Session, user_id: int) -> user.User | None:
     """
     db_user = db.query(user.User).filter(user.User.id == user_id).first()
     if db_user:
+        email = db_user.email
         db.delete(db_user)
         db.commit()
+        auth_cache.invalidate_user(email)
     return db_user
 
 
@@ -97,18 +171,41 @@ def create_company(db: Session, company_data: company_schema.CompanyCreate) -> c
     db.refresh(db_company)
     return db_company
 
-def get_companies(db: Session, skip: int = 0, limit: int = 100) -> List[company.Company]:
+def get_companies(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: int | None = None,
+    with_device_counts: bool = False
+) -> List[company.Company]:
     """
-    Obtiene una lista de todas las compañías,
-    cargando anticipadamente sus centros (centers).
+    Obtiene una lista de todas las compañías, con sus centros (centers).
+    Los centros se cargan con UNA consulta aparte (selectinload, WHERE company_id IN ...)
+    para que el LIMIT aplique a compañías y no a filas compañía×centro.
+    Con `with_device_counts` agrega `device_count` por compañía (un solo GROUP BY).
+    Con `after_id` pagina por keyset (id > after_id) en vez de OFFSET.
     """
-    return (
+    query = (
         db.query(company.Company)
-        .options(joinedload(company.Company.centers)) # <-- ESTA LÍNEA ES LA MAGIA
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .options(selectinload(company.Company.centers))
+        .order_by(company.Company.id)
     )
+    if after_id is not None:
+        companies = query.filter(company.Company.id > after_id).limit(limit).all()
+    else:
+        companies = query.offset(skip).limit(limit).all()
+
+    if with_device_counts and companies:
+        counts = dict(
+            db.query(center.Center.company_id, func.count(device.Device.id))
+            .join(device.Device, device.Device.center_id == center.Center.id)
+            .filter(center.Center.company_id.in_([c.id for c in companies]))
+            .group_by(center.Center.company_id)
+            .all()
+        )
+        for db_company in companies:
+            db_company.device_count = counts.get(db_company.id, 0)
+    return companies
 
 def update_company(
     db: Session, 
@@ -151,6 +248,28 @@ def create_center(db: Session, center_data: center_schema.CenterCreate) -> cente
     db.refresh(db_center)
     return db_center
 
+def bulk_create_centers(db: Session, centers_data: List[center_schema.CenterCreate]) -> List[dict]:
+    """
+    Crea todos los centros en una transacción (INSERT multi-fila con RETURNING).
+    Devuelve las filas creadas sin hacer refresh por fila.
+    """
+    try:
+        result = db.execute(
+            insert(center.Center).returning(
+                center.Center.id,
+                center.Center.name,
+                center.Center.company_id,
+                center.Center.price_kwh
+            ),
+            [c.model_dump() for c in centers_data]
+        )
+        created = [row._asdict() for row in result]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return created
+
 def get_center_by_id(db: Session, center_id: int) -> center.Center | None:
     """Obtiene un centro por su ID."""
     return db.query(center.Center).filter(center.Center.id == center_id).first()
@@ -0,0 +1,160 @@
+# app/db/mongo_indexes.py
+"""
+Índices requeridos en Mongo y verificación de planes de consulta.
+
+Todas las consultas calientes filtran por deviceInfo.devEui + time (y a veces
+object) y ordenan por time. El índice compuesto (devEui, time) sirve para
+todas: el orden descendente se resuelve recorriendo el índice al revés.
+
+No es un índice parcial sobre object: {$type: "object"}: Mongo solo usa un
+índice parcial si el filtro de la consulta implica la condición, y varias
+consultas calientes no filtran por object (ETag / última lectura en
+app/core/etag.py, details con object.agg_activeEnergy, exportación, sondeo
+en vivo). Con un índice parcial esas consultas harían COLLSCAN.
+
+- ensure_indexes(): crea (idempotente) y verifica los índices.
+- verify_query_plans(): corre explain sobre cada forma canónica de consulta
+  y reporta COLLSCAN o SORT en memoria.
+"""
+import datetime
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.core.time_buckets import date_trunc_expr
+
+DEVICE_TIME_INDEX = [("deviceInfo.devEui", 1), ("time", 1)]
+
+# (clave de colección, keys, opciones). Agregar aquí nuevas colecciones (p.ej. rollups).
+INDEX_SPECS = [
+    ("energy", DEVICE_TIME_INDEX, {"name": "devEui_time"}),
+    ("fuel", DEVICE_TIME_INDEX, {"name": "devEui_time"}),
+]
+
+# Etapas que delatan una consulta sin índice adecuado
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT"}
+
+_SAMPLE_EUI = "0000000000000000"
+
+
+def _collections(db_energy: AsyncIOMotorDatabase, db_fuel: AsyncIOMotorDatabase) -> dict:
+    return {
+        "energy": db_energy[settings.MONGO_COLLECTION_NAME],
+        "fuel": db_fuel[settings.MONGO_COLLECTION_NAME2],
+    }
+
+
+async def ensure_indexes(db_energy: AsyncIOMotorDatabase, db_fuel: AsyncIOMotorDatabase) -> List[str]:
+    """
+    Crea los índices de INDEX_SPECS (si ya hay uno con las mismas keys, con
+    cualquier nombre, no hace nada) y verifica
+    que estén presentes. Devuelve la lista de problemas (vacía si todo ok).
+    """
+    collections = _collections(db_energy, db_fuel)
+    problems = []
+    for key, keys, options in INDEX_SPECS:
+        collection = collections[key]
+        # Un índice con las mismas keys pero otro nombre (p.ej. el default
+        # deviceInfo.devEui_1_time_1) sirve igual; crearlo de nuevo con otro
+        # nombre falla con IndexOptionsConflict.
+        if await _has_index(collection, keys):
+            continue
+        try:
+            await collection.create_index(keys, **options)
+        except OperationFailure as e:
+            problems.append(f"{collection.full_name}: no se pudo crear el índice {keys}: {e}")
+            continue
+
+        if not await _has_index(collection, keys):
+            problems.append(f"{collection.full_name}: falta el índice {keys}")
+    return problems
+
+
+async def _has_index(collection, keys) -> bool:
+    index_info = await collection.index_information()
+    return any(list(info.get("key", [])) == list(keys) for info in index_info.values())
+
+
+def _canonical_queries() -> List[tuple]:
+    """
+    Formas canónicas de las consultas calientes:
+    (clave de colección, descripción, comando a explicar sin el nombre de colección)
+    """
+    end = datetime.datetime.now(datetime.timezone.utc)
+    start = end - datetime.timedelta(days=1)
+    range_match = {
+        "deviceInfo.devEui": _SAMPLE_EUI,
+        "time": {"$gte": start, "$lte": end},
+        "object": {"$type": "object"},
+    }
+    latest = {
+        "filter": {"deviceInfo.devEui": _SAMPLE_EUI, "object": {"$type": "object"}},
+        "sort": {"time": -1},
+        "limit": 1,
+    }
+    return [
+        ("energy", "último documento (summary)", {"find": latest}),
+        ("fuel", "último documento (fuel summary)", {"find": latest}),
+        ("energy", "rango crudo ordenado (summary)", {"find": {"filter": range_match, "sort": {"time": 1}}}),
+        ("energy", "primer/último del rango (consumo)", {"find": {**latest, "filter": range_match, "sort": {"time": 1}}}),
+        ("energy", "agregación en buckets (summary / history)", {"aggregate": {
+            "pipeline": [
+                {"$match": range_match},
+                {"$sort": {"time": 1}},
+                {"$group": {"_id": date_trunc_expr(15, "minute"), "v": {"$last": "$object.agg_activeEnergy"}}},
+            ],
+            "cursor": {},
+        }}),
+        ("energy", "consumo diario (details)", {"aggregate": {
+            "pipeline": [
+                {"$match": {
+                    "deviceInfo.devEui": _SAMPLE_EUI,
+                    "time": {"$gte": start, "$lte": end},
+                    "object.agg_activeEnergy": {"$exists": True},
+                }},
+                {"$sort": {"time": 1}},
+                {"$group": {"_id": None, "readings": {"$push": "$object.agg_activeEnergy"}}},
+            ],
+            "cursor": {},
+        }}),
+    ]
+
+
+def plan_stages(node, stages: set) -> set:
+    """ Junta todos los 'stage' del plan ganador (ignora rejectedPlans) """
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "rejectedPlans":
+                continue
+            if key == "stage" and isinstance(value, str):
+                stages.add(value)
+            else:
+                plan_stages(value, stages)
+    elif isinstance(node, list):
+        for item in node:
+            plan_stages(item, stages)
+    return stages
+
+
+async def verify_query_plans(db_energy: AsyncIOMotorDatabase, db_fuel: AsyncIOMotorDatabase) -> List[str]:
+    """
+    Corre explain("queryPlanner") sobre cada forma canónica.
+    Devuelve la lista de problemas (COLLSCAN / SORT en memoria).
+    """
+    collections = _collections(db_energy, db_fuel)
+    problems = []
+    for key, description, spec in _canonical_queries():
+        collection = collections[key]
+        (command_name, body), = spec.items()
+        command = {command_name: collection.name, **body}
+        explain = await collection.database.command(
+            {"explain": command, "verbosity": "queryPlanner"}
+        )
+        bad_stages = plan_stages(explain, set()) & FORBIDDEN_STAGES
+        if bad_stages:
+            problems.append(
+                f"{collection.full_name} [{description}]: plan con {', '.join(sorted(bad_stages))}"
+            )
+    return problems
@@ -1,6 +1,9 @@
 # app/db/mongodb.py
 import motor.motor_asyncio
 from app.core.config import settings
+from app.db import mongo_indexes
+from app.core.metrics import MongoCommandMetrics
+from app.core.request_timing import MongoCommandTiming
 
 client: motor.motor_asyncio.AsyncIOMotorClient = None
 db_energy: motor.motor_asyncio.AsyncIOMotorDatabase = None
@@ -9,7 +12,10 @@ db_fuel: motor.motor_asyncio.AsyncIOMotorDatabase = None
 async def connect_to_mongo():
     global client, db_energy, db_fuel
     print("Iniciando conexión a MongoDB...")
-    client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGO_URL)
+    client = motor.motor_asyncio.AsyncIOMotorClient(
+        settings.MONGO_URL,
+        event_listeners=[MongoCommandMetrics(), MongoCommandTiming()]
+    )
     
     db_energy = client[settings.MONGO_DB_NAME]
     
@@ -17,6 +23,12 @@ async def connect_to_mongo():
     
     print(f"Conectado a MongoDB. DB Energia: '{settings.MONGO_DB_NAME}', DB Combustible: '{settings.MONGO_FUEL_DB_NAME}'")
 
+    if settings.MONGO_ENSURE_INDEXES:
+        problems = await mongo_indexes.ensure_indexes(db_energy, db_fuel)
+        if problems:
+            raise RuntimeError(f"Índices de MongoDB incompletos: {problems}")
+        print("Índices de MongoDB verificados.")
+
 async def close_mongo_connection():
     global client
     if client:
@@ -0,0 +1,181 @@
+# app/db/slow_queries.py
+"""
+Registro de consultas lentas a Mongo.
+
+Las rutas llaman a find_one / find / aggregate de este módulo en lugar de
+usar la colección de Motor directamente. Si una consulta tarda más de
+MONGO_SLOW_QUERY_MS:
+
+- se loguea con su forma normalizada (valores reemplazados por "?"),
+  duración y documentos devueltos;
+- se guarda en un anillo acotado (MONGO_SLOW_QUERY_RING_SIZE) que se lee
+  desde GET /api/admin/slow-queries;
+- con MONGO_SLOW_QUERY_EXPLAIN, se corre explain("executionStats") en
+  segundo plano y su resumen se agrega a la entrada.
+"""
+import asyncio
+import datetime
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.core.config import settings
+from app.db.mongo_indexes import plan_stages
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = {"sort", "$sort"}
+EXPLAIN_STATS_FIELDS = ("nReturned", "executionTimeMillis", "totalKeysExamined", "totalDocsExamined")
+
+# Entradas más recientes al final
+recent: deque = deque(maxlen=settings.MONGO_SLOW_QUERY_RING_SIZE)
+
+# Referencias a los explain en curso (para que no los recolecte el GC)
+_pending_explains: set = set()
+
+
+def normalize_shape(value: Any) -> Any:
+    """
+    Forma de la consulta sin valores concretos: conserva claves, operadores,
+    referencias a campos ("$time") y los sorts; los literales pasan a "?" y
+    las listas de literales (p.ej. un $in con cientos de EUIs) a ["?"].
+    """
+    if isinstance(value, dict):
+        return {
+            key: item if key in SORT_KEYS else normalize_shape(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(item, (dict, list, tuple)) for item in value):
+            return [normalize_shape(item) for item in value]
+        return ["?"]
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def _summarize_explain(explain: dict) -> dict:
+    """ Etapas del plan ganador + contadores del primer executionStats encontrado """
+    summary: Dict[str, Any] = {"stages": sorted(plan_stages(explain, set()))}
+    pending = [explain]
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, dict):
+            stats = node.get("executionStats")
+            if isinstance(stats, dict):
+                summary.update({k: stats[k] for k in EXPLAIN_STATS_FIELDS if k in stats})
+                break
+            pending.extend(node.values())
+        elif isinstance(node, list):
+            pending.extend(node)
+    return summary
+
+
+async def _explain(collection: AsyncIOMotorCollection, command: dict, entry: dict) -> None:
+    try:
+        explain = await collection.database.command(
+            {"explain": command, "verbosity": "executionStats"}
+        )
+        entry["explain"] = _summarize_explain(explain)
+    except Exception as e:
+        entry["explain"] = {"error": str(e)}
+
+
+def _record(
+    collection: AsyncIOMotorCollection,
+    operation: str,
+    shape_source: Any,
+    command: dict,
+    started: float,
+    docs: int,
+) -> None:
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < settings.MONGO_SLOW_QUERY_MS:
+        return
+
+    entry = {
+        "recorded_at": datetime.datetime.now(datetime.timezone.utc),
+        "collection": collection.full_name,
+        "operation": operation,
+        "shape": normalize_shape(shape_source),
+        "duration_ms": round(duration_ms, 1),
+        "docs": docs,
+        "explain": None,
+    }
+    recent.append(entry)
+    logger.warning(
+        "Consulta lenta en Mongo (%.1f ms, %d docs) %s.%s: %s",
+        duration_ms, docs, collection.full_name, operation, entry["shape"]
+    )
+
+    if settings.MONGO_SLOW_QUERY_EXPLAIN:
+        task = asyncio.create_task(_explain(collection, command, entry))
+        _pending_explains.add(task)
+        task.add_done_callback(_pending_explains.discard)
+
+
+def _find_command(
+    collection: AsyncIOMotorCollection,
+    filter: dict,
+    projection: Optional[dict],
+    sort: Optional[Sequence[tuple]],
+    limit: int = 0,
+) -> dict:
+    command: Dict[str, Any] = {"find": collection.name, "filter": filter}
+    if projection:
+        command["projection"] = projection
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    return command
+
+
+async def find_one(
+    collection: AsyncIOMotorCollection,
+    filter: dict,
+    projection: Optional[dict] = None,
+    sort: Optional[Sequence[tuple]] = None,
+) -> Optional[dict]:
+    started = time.perf_counter()
+    doc = await collection.find_one(filter, projection=projection, sort=sort)
+    _record(
+        collection, "find_one", {"filter": filter, "sort": dict(sort or [])},
+        _find_command(collection, filter, projection, sort, limit=1),
+        started, 1 if doc else 0,
+    )
+    return doc
+
+
+async def find(
+    collection: AsyncIOMotorCollection,
+    filter: dict,
+    projection: Optional[dict] = None,
+    sort: Optional[Sequence[tuple]] = None,
+) -> List[dict]:
+    """ find completo (to_list) """
+    started = time.perf_counter()
+    cursor = collection.find(filter, projection=projection)
+    if sort:
+        cursor = cursor.sort(list(sort))
+    docs = await cursor.to_list(length=None)
+    _record(
+        collection, "find", {"filter": filter, "sort": dict(sort or [])},
+        _find_command(collection, filter, projection, sort),
+        started, len(docs),
+    )
+    return docs
+
+
+async def aggregate(collection: AsyncIOMotorCollection, pipeline: List[dict]) -> List[dict]:
+    started = time.perf_counter()
+    docs = await collection.aggregate(pipeline).to_list(length=None)
+    _record(
+        collection, "aggregate", pipeline,
+        {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+        started, len(docs),
+    )
+    return docs
@@ -1,13 +1,27 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from app.db.mongodb import connect_to_mongo, close_mongo_connection
-from app.api.endpoints import auth, fuel, users, devices, energy, centers
+from app.api.endpoints import auth, fuel, users, devices, energy, centers, metrics, admin, live
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER, SYNC_CURSOR_HEADER
+from app.core.metrics import MetricsMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.request_timing import ServerTimingMiddleware, install_sql_timing
+from app.core.profiling import ProfilingMiddleware, PROFILER_AVAILABLE, PROFILE_REPORT_HEADER
+from app.core.config import settings
+from app.core.loop_monitor import loop_monitor
+from app.core.live_stream import live_hub
+from app.db.database import engine
 # Evento de ciclo de vida para conectar y desconectar MongoDB al iniciar/apagar
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
     yield
+    if settings.LOOP_MONITOR_ENABLED:
+        await loop_monitor.stop()
+    await live_hub.stop()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -29,7 +43,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, SYNC_CURSOR_HEADER, "ETag", "Server-Timing", PROFILE_REPORT_HEADER],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+install_sql_timing(engine)
+
+# Solo se instala con PROFILING_ENABLED: desactivado no agrega costo a ningún request
+if settings.PROFILING_ENABLED:
+    if PROFILER_AVAILABLE:
+        app.add_middleware(ProfilingMiddleware, output_dir=settings.PROFILE_OUTPUT_DIR)
+    else:
+        print("PROFILING_ENABLED pero pyinstrument no está instalado; profiling desactivado.")
 
 # Incluir los routers
 app.include_router(auth.router, prefix="/api", tags=["Auth"])
@@ -38,6 +64,9 @@ app.include_router(devices.router, prefix="/api", tags=["Devices"])
 app.include_router(energy.router, prefix="/api/energy", tags=["Energy Data"])
 app.include_router(fuel.router, prefix="/api/fuel", tags=["Fuel Data"])
 app.include_router(centers.router, prefix="/api", tags=["Centers"])
+app.include_router(live.router, prefix="/api", tags=["Live"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 
 @app.get("/api/health")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, String, Enum as SAEnum
+from sqlalchemy import Column, ForeignKey, String, Index, Enum as SAEnum
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 import enum
@@ -10,6 +10,8 @@ class UserRole(str, enum.Enum):
 
 class UserCompany(Base):
     __tablename__ = "user_company"
+    # user_id ya queda cubierto por la PK (user_id, company_id)
+    __table_args__ = (Index("ix_user_company_company_id", "company_id"),)
     user_id = Column(ForeignKey("users.id"), primary_key=True)
     company_id = Column(ForeignKey("companies.id"), primary_key=True)
     role = Column(SAEnum(UserRole), nullable=False, default=UserRole.viewer)
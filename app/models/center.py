@@ -9,7 +9,7 @@ class Center(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
     
-    company_id = Column(Integer, ForeignKey("companies.id"))
+    company_id = Column(Integer, ForeignKey("companies.id"), index=True)
     company = relationship("Company", back_populates="centers")
     
     devices = relationship("Device", back_populates="center")
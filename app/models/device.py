@@ -1,5 +1,5 @@
 # app/models/device.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum as SAEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, Enum as SAEnum
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 import enum
@@ -16,6 +16,10 @@ class DeviceType(str, enum.Enum):
 
 class Device(Base):
     __tablename__ = "devices"
+    __table_args__ = (
+        # summary de energía / combustible: filtro por centro + tipo
+        Index("ix_devices_center_id_type", "center_id", "type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
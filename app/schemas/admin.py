@@ -0,0 +1,19 @@
+import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+
+class SlowQueryRecord(BaseModel):
+    recorded_at: datetime.datetime
+    collection: str
+    operation: str
+    shape: Any
+    duration_ms: float
+    docs: int
+    explain: Optional[Dict[str, Any]] = None
+
+
+class LoopBlockRecord(BaseModel):
+    recorded_at: datetime.datetime
+    blocked_ms: float
+    stack: str
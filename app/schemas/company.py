@@ -22,6 +22,7 @@ class CompanyWithUsers(Company):
     users: List[UserInCompany] = []
 class CompanyWithCenters(Company):
     centers: List[Center] = []
+    device_count: Optional[int] = None
 class CompanyAssignment(BaseModel):
     user_id: int
     company_id: int
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from app.models.device import DeviceStatus, DeviceType
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 import datetime
 
 
@@ -29,6 +29,19 @@ class Device(DeviceBase):
     class Config:
         from_attributes = True
 
+class DeviceBulkResult(BaseModel):
+    """Resultado de una fila de la carga masiva."""
+    row: int
+    dev_eui: Optional[str] = None
+    status: str  # "created" | "error"
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class DeviceBulkResponse(BaseModel):
+    created: int
+    errors: int
+    results: List[DeviceBulkResult]
+
 class DeviceDetails(BaseModel):
     """Schema para la tabla principal de sensores."""
     id: int
@@ -85,5 +98,18 @@ class MongoHistoryRecord(BaseModel):
     class Config:
         extra = 'ignore'
 
+class DeviceHistorySeries(BaseModel):
+    """Serie de un dispositivo, alineada al eje 'timestamps' (None = bucket sin datos)."""
+    devEui: str
+    name: str
+    type: DeviceType
+    values: Dict[str, List[Optional[float]]]
+
+class MultiDeviceHistory(BaseModel):
+    """Historial de varios dispositivos sobre un eje de tiempo común."""
+    resolution: str
+    timestamps: List[datetime.datetime]
+    series: List[DeviceHistorySeries]
+
 class DeviceWithLatestData(Device):
     latest_measurement: MongoMeasurementData | MongoCombustibleData | dict | None = None
\ No newline at end of file
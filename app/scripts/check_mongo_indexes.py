@@ -0,0 +1,45 @@
+# app/scripts/check_mongo_indexes.py
+"""
+Diagnóstico de índices y planes de consulta de MongoDB.
+
+    python -m app.scripts.check_mongo_indexes [--create]
+
+Corre explain sobre cada forma canónica de consulta y termina con código 1
+si alguna usa COLLSCAN o un SORT en memoria.
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db import mongodb
+from app.db import mongo_indexes
+
+
+async def main(create: bool) -> int:
+    await mongodb.connect_to_mongo()
+    try:
+        problems = []
+        if create:
+            print("Creando/verificando índices...")
+            problems += await mongo_indexes.ensure_indexes(mongodb.db_energy, mongodb.db_fuel)
+
+        print("Verificando planes de consulta (explain)...")
+        problems += await mongo_indexes.verify_query_plans(mongodb.db_energy, mongodb.db_fuel)
+    finally:
+        await mongodb.close_mongo_connection()
+
+    if problems:
+        print("\nERROR: consultas sin índice adecuado:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+
+    print("OK: todas las consultas canónicas usan índice y no ordenan en memoria.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica índices y planes de MongoDB")
+    parser.add_argument("--create", action="store_true", help="Crear los índices antes de verificar")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.create)))
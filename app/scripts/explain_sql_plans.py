@@ -0,0 +1,105 @@
+# app/scripts/explain_sql_plans.py
+"""
+Muestra el EXPLAIN de las consultas SQL calientes y verifica que usen índices.
+
+    python -m app.scripts.explain_sql_plans [--company-id 1] [--user-id 1]
+
+En PostgreSQL desactiva enable_seqscan para la sesión: si aun así el plan
+hace "Seq Scan" sobre alguna tabla, no hay un índice que lo sirva y el script
+termina con código 1. (Con tablas chicas el planner prefiere Seq Scan aunque
+el índice exista, por eso no se mira el plan "natural".)
+
+Las consultas de _known_unindexed_queries se muestran pero no cuentan como
+error: se sabe que ningún índice las resuelve (ver get_devices_with_details).
+"""
+import argparse
+import sys
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal, engine
+from app.models.association import UserCompany
+from app.models.center import Center
+from app.models.company import Company
+from app.models.device import Device, DeviceType
+
+
+def _canonical_queries(db, company_id: int, user_id: int) -> list:
+    """ (descripción, Query) de las rutas de energía, combustible y listados """
+    return [
+        ("compañías del usuario (todas las rutas)",
+         db.query(UserCompany).filter(UserCompany.user_id == user_id)),
+        ("dispositivos de energía (energy/summary)",
+         db.query(Device).join(Center).filter(
+             Center.company_id.in_([company_id]), Device.type == DeviceType.energia)),
+        ("centros de la compañía (fuel/summary)",
+         db.query(Center).filter(Center.company_id.in_([company_id]))),
+        ("dispositivos de combustible por centro (fuel/summary)",
+         db.query(Device).filter(Device.center_id == 1, Device.type == DeviceType.combustible)),
+        ("dispositivo por EUI con permisos (details / price)",
+         db.query(Device).join(Center).filter(
+             Device.dev_eui == "0000000000000000", Center.company_id.in_([company_id]))),
+        ("usuarios de una compañía",
+         db.query(UserCompany).filter(UserCompany.company_id == company_id)),
+    ]
+
+
+def _known_unindexed_queries(db) -> list:
+    """ (descripción, Query) que hoy recorren y ordenan la tabla completa """
+    return [
+        ("keyset de /devices/details (join + sort de toda la flota)",
+         db.query(Device.id)
+         .join(Center, Device.center_id == Center.id)
+         .join(Company, Center.company_id == Company.id)
+         .order_by(Company.name, Center.name, Device.name, Device.id)
+         .limit(100)),
+    ]
+
+
+def _explain(db, query, is_postgres: bool) -> list:
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN " if is_postgres else "EXPLAIN QUERY PLAN "
+    return [" | ".join(str(col) for col in row) for row in db.execute(text(prefix + sql))]
+
+
+def main(company_id: int, user_id: int) -> int:
+    is_postgres = engine.dialect.name == "postgresql"
+    failures = []
+
+    with SessionLocal() as db:
+        if is_postgres:
+            db.execute(text("SET enable_seqscan = off"))
+
+        for description, query in _canonical_queries(db, company_id, user_id):
+            plan_lines = _explain(db, query, is_postgres)
+
+            print(f"\n=== {description} ===")
+            for line in plan_lines:
+                print(f"  {line}")
+
+            seq_scans = [l for l in plan_lines if "Seq Scan" in l] if is_postgres else \
+                        [l for l in plan_lines if "SCAN" in l and "USING" not in l]
+            if seq_scans:
+                failures.append(description)
+
+        for description, query in _known_unindexed_queries(db):
+            print(f"\n=== {description} [sin índice, conocido] ===")
+            for line in _explain(db, query, is_postgres):
+                print(f"  {line}")
+
+    if failures:
+        print("\nERROR: consultas sin índice que las sirva:")
+        for description in failures:
+            print(f"  - {description}")
+        return 1
+
+    print("\nOK: todas las consultas canónicas pueden usar un índice.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN de las consultas SQL calientes")
+    parser.add_argument("--company-id", type=int, default=1)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(main(args.company_id, args.user_id))
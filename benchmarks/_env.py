@@ -0,0 +1,25 @@
+# benchmarks/_env.py
+"""
+Valores por defecto para las variables que exige app.core.config.Settings,
+de modo que los benchmarks se puedan importar sin un .env real.
+Llamar a configure_env() ANTES de importar cualquier módulo de `app`.
+"""
+import os
+
+DEFAULTS = {
+    "DATABASE_URL": "sqlite:///./bench.db",
+    "MONGO_URL": "mongodb://localhost:27017",
+    "MONGO_DB_NAME": "bench_energia",
+    "MONGO_COLLECTION_NAME": "uplinks",
+    "MONGO_FUEL_DB_NAME": "bench_combustible",
+    "MONGO_COLLECTION_NAME2": "uplinks",
+    "SECRET_KEY": "bench-secret-key",
+}
+
+
+def configure_env(**overrides: str) -> None:
+    for key, value in overrides.items():
+        if value is not None:
+            os.environ[key] = value
+    for key, value in DEFAULTS.items():
+        os.environ.setdefault(key, value)
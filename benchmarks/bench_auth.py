@@ -0,0 +1,74 @@
+# benchmarks/bench_auth.py
+"""
+Overhead de autenticación por request: get_current_user sin caché
+(jwt.decode + SELECT del usuario en cada llamada) vs. con auth_cache.
+
+Usa SQLite en memoria; no necesita Postgres.
+
+Uso:
+    python -m benchmarks.bench_auth [--requests 5000]
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks._env import configure_env
+
+configure_env(DATABASE_URL="sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.dependencies import get_current_user
+from app.core import auth_cache, security
+from app.core.config import settings
+from app.db.database import Base
+from app.models.association import UserCompany  # noqa: F401 (registra la tabla)
+from app.models.center import Center  # noqa: F401
+from app.models.company import Company  # noqa: F401
+from app.models.device import Device  # noqa: F401
+from app.models.user import User
+
+
+def measure(label: str, session_factory, token: str, n_requests: int, statements: list) -> float:
+    statements.clear()
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        with session_factory() as db:
+            get_current_user(db=db, token=token)
+    elapsed = time.perf_counter() - start
+    per_request_us = elapsed / n_requests * 1e6
+    print(f"{label:<12} {per_request_us:8.1f} µs/request  {len(statements) / n_requests:.2f} SQL/request")
+    return per_request_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.append(a[2]))
+
+    with session_factory() as db:
+        db.add(User(email="bench@example.com", hashed_password="no-se-usa", is_active=True))
+        db.commit()
+    token = security.create_access_token({"sub": "bench@example.com"}, expires_delta=datetime.timedelta(hours=1))
+
+    settings.AUTH_CACHE_ENABLED = False
+    before = measure("sin caché", session_factory, token, args.requests, statements)
+
+    settings.AUTH_CACHE_ENABLED = True
+    auth_cache.token_cache.clear()
+    auth_cache.user_cache.clear()
+    after = measure("con caché", session_factory, token, args.requests, statements)
+
+    print(f"Mejora: x{before / after:.1f}  (stats: {dict(auth_cache.stats)})")
+
+
+if __name__ == "__main__":
+    main()
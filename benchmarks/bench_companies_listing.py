@@ -0,0 +1,106 @@
+# benchmarks/bench_companies_listing.py
+"""
+Benchmark del listado de compañías: joinedload + OFFSET/LIMIT (ruta anterior)
+vs. selectinload (+ conteo de dispositivos con un GROUP BY).
+
+Usa SQLite en memoria con 1k compañías × 50 centros por defecto.
+
+Uso:
+    python -m benchmarks.bench_companies_listing [--companies 1000] [--centers 50]
+"""
+import argparse
+import time
+
+from benchmarks._env import configure_env
+
+configure_env(DATABASE_URL="sqlite://")
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import joinedload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.crud import crud_user
+from app.db.database import Base
+from app.models.association import UserCompany  # noqa: F401 (registra la tabla)
+from app.models.center import Center
+from app.models.company import Company
+from app.models.device import Device, DeviceStatus, DeviceType
+from app.models.user import User  # noqa: F401 (registra la tabla)
+from app.schemas.company import CompanyWithCenters
+
+
+def seed(session, n_companies: int, n_centers: int, devices_per_center: int) -> None:
+    session.execute(insert(Company), [{"id": i, "name": f"Compañía {i:05d}"} for i in range(1, n_companies + 1)])
+    centers = []
+    for company_id in range(1, n_companies + 1):
+        for j in range(n_centers):
+            centers.append({"company_id": company_id, "name": f"Centro {company_id}-{j}", "price_kwh": 250.0})
+    session.execute(insert(Center), centers)
+    devices = []
+    for center_id in range(1, len(centers) + 1):
+        for k in range(devices_per_center):
+            devices.append({
+                "name": f"Medidor {center_id}-{k}",
+                "dev_eui": f"{center_id:012x}{k:04x}",
+                "status": DeviceStatus.active,
+                "type": DeviceType.energia,
+                "center_id": center_id,
+            })
+    session.execute(insert(Device), devices)
+    session.commit()
+
+
+def legacy_get_companies(db, skip: int, limit: int):
+    """ Ruta anterior: joinedload(centers) + OFFSET/LIMIT """
+    return (
+        db.query(Company)
+        .options(joinedload(Company.centers))
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def run(label: str, session_factory, fetch_page, n_companies: int, page_size: int, statements: list) -> None:
+    statements.clear()
+    start = time.perf_counter()
+    rows = 0
+    with session_factory() as db:
+        for skip in range(0, n_companies, page_size):
+            page = fetch_page(db, skip, page_size)
+            rows += len([CompanyWithCenters.model_validate(c) for c in page])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<38} {elapsed * 1000:9.1f} ms  {len(statements):4d} SQL  {rows} compañías")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--centers", type=int, default=50)
+    parser.add_argument("--devices-per-center", type=int, default=2)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.append(a[2]))
+
+    print(f"Sembrando {args.companies} compañías × {args.centers} centros × {args.devices_per_center} dispositivos...")
+    with session_factory() as db:
+        seed(db, args.companies, args.centers, args.devices_per_center)
+
+    run("legacy: joinedload + offset/limit", session_factory, legacy_get_companies,
+        args.companies, args.page_size, statements)
+    run("selectinload", session_factory,
+        lambda db, skip, limit: crud_user.get_companies(db, skip=skip, limit=limit),
+        args.companies, args.page_size, statements)
+    run("selectinload + device counts", session_factory,
+        lambda db, skip, limit: crud_user.get_companies(db, skip=skip, limit=limit, with_device_counts=True),
+        args.companies, args.page_size, statements)
+
+
+if __name__ == "__main__":
+    main()
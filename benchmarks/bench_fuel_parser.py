@@ -0,0 +1,116 @@
+# benchmarks/bench_fuel_parser.py
+"""
+Microbenchmark: parser liviano de combustible vs. la ruta anterior.
+
+- legacy: MongoFuelDoc.model_validate + 3 FuelSensorData + 3 FuelTank
+  validados por uplink, y el FuelCenter del centro con esos modelos.
+- fast: parse_fuel_tanks arma los tanques como dicts y el centro se valida
+  una vez como FuelCenter (lo que hace response_model en get_fuel_summary).
+  La ruta anterior además pagaba el model_dump + revalidación de
+  response_model sobre sus modelos; eso no se cuenta aquí.
+
+Se mide un centro con --devices dispositivos y se reporta µs por documento.
+Es solo CPU en proceso: la proyección de Mongo (FUEL_PROJECTION) reduce lo
+que viaja por la red y lo que decodifica el driver, y no entra en esta medida.
+
+Uso:
+    python -m benchmarks.bench_fuel_parser [--iterations 2000] [--devices 10]
+"""
+import argparse
+import datetime
+import timeit
+
+from app.core.fuel_parser import parse_fuel_tanks, parse_stats
+from app.schemas.fuel import FuelCenter, FuelSensorData, FuelTank, MongoFuelDoc
+
+SAMPLE_DOC = {
+    "time": datetime.datetime(2025, 10, 20, 12, 30, tzinfo=datetime.timezone.utc),
+    "deviceInfo": {"devEui": "a84041000181c2b0", "deviceName": "Estanque Norte"},
+    "rxInfo": [{"gatewayId": "gw-01", "rssi": -97, "location": {"latitude": -33.45, "longitude": -70.66}}],
+    "object": {
+        "volume_L_S0": 7321.5, "percentage_S0": 73.2, "pressure_Bar_S0": 1.21, "sensor_0_ok": True,
+        "volume_L_S1": 10120.0, "percentage_S1": 67.5, "pressure_Bar_S1": 1.05, "sensor_1_ok": True,
+        "volume_L_S2": None, "percentage_S2": 12.0, "pressure_Bar_S2": 0.98, "sensor_2_ok": False,
+        "battery": 3.6, "temperature": 18.2,
+    },
+}
+
+_LEGACY_SLOTS = (
+    ("S0", "Tanque S0 (Diesel)", 10000, "Diesel"),
+    ("S1", "Tanque S1 (Gasolina)", 15000, "Gasolina"),
+    ("S2", "Tanque S2 (Biodiesel)", 8000, "Biodiesel"),
+)
+
+
+def legacy_create_tanks(dev_eui: str, mongo_doc: dict, center_id_str: str):
+    """ Copia de la ruta anterior (_create_tanks_from_mongo con validación completa) """
+    try:
+        mongo_data = MongoFuelDoc.model_validate(mongo_doc)
+        mongo_obj = mongo_data.object
+        last_update_iso = mongo_data.time.isoformat()
+        lat = mongo_data.rxInfo[0].location.latitude if mongo_data.rxInfo and mongo_data.rxInfo[0].location else 0.0
+        lon = mongo_data.rxInfo[0].location.longitude if mongo_data.rxInfo and mongo_data.rxInfo[0].location else 0.0
+        tanks = []
+        for i, (suffix, name, capacity, fuel_type) in enumerate(_LEGACY_SLOTS):
+            sensor = FuelSensorData(
+                volume_L=getattr(mongo_obj, f"volume_L_{suffix}") or 0.0,
+                percentage=getattr(mongo_obj, f"percentage_{suffix}") or 0.0,
+                pressure_Bar=getattr(mongo_obj, f"pressure_Bar_{suffix}") or 0.0,
+                sensor_ok=getattr(mongo_obj, f"sensor_{i}_ok"),
+                lastUpdate=last_update_iso,
+                latitude=lat,
+                longitude=lon
+            )
+            tanks.append(FuelTank(
+                id=f"{dev_eui}-{suffix}", name=name, capacity=capacity,
+                fuelType=fuel_type, sensor=sensor, centerId=center_id_str
+            ))
+        return tanks
+    except Exception:
+        return []
+
+
+def _center(tanks) -> FuelCenter:
+    return FuelCenter.model_validate({
+        "id": "1", "name": "Centro bench", "location": "Ubicación de Centro bench", "status": "secure",
+        "tanks": tanks, "totalCapacity": 0, "currentInventory": 0.0,
+    })
+
+
+def legacy_center(docs):
+    tanks = []
+    for dev_eui, doc in docs:
+        tanks.extend(legacy_create_tanks(dev_eui, doc, "1"))
+    return _center(tanks)
+
+
+def fast_center(docs):
+    tanks = []
+    for dev_eui, doc in docs:
+        tanks.extend(parse_fuel_tanks(dev_eui, doc, "1"))
+    return _center(tanks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--devices", type=int, default=10)
+    args = parser.parse_args()
+
+    docs = [(f"a84041000181{i:04x}", SAMPLE_DOC) for i in range(args.devices)]
+    assert legacy_center(docs).model_dump() == fast_center(docs).model_dump(), "Los parsers no coinciden"
+
+    results = {}
+    for label, fn in (("legacy (model_validate)", legacy_center), ("fast (parse_fuel_tanks)", fast_center)):
+        seconds = min(timeit.repeat(lambda: fn(docs), number=args.iterations, repeat=5))
+        per_doc = seconds / (args.iterations * args.devices)
+        results[label] = seconds
+        print(f"{label:<26} {per_doc * 1e6:8.2f} µs/doc  ({1 / per_doc:,.0f} docs/s)")
+
+    legacy_s, fast_s = results.values()
+    print(f"Speedup: x{legacy_s / fast_s:.2f}")
+    print(f"parse_stats: {dict(parse_stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# benchmarks/bench_hot_loops.py
+"""
+Microbenchmarks de las partes CPU de los summaries, sin bases de datos.
+
+Fixtures fijas (mismo generador y semilla que benchmarks.fleet):
+- 1 día de uplinks crudos cada 5 min (288 docs) para el historial crudo
+- 30 días en buckets de 30 min (1440 docs) para el historial agregado
+- 1 documento de combustible con tres estanques
+
+Para cada objetivo reporta llamadas/s, puntos/s (elementos procesados por
+llamada) y memoria por llamada medida con tracemalloc (pico y bloques que
+quedan vivos).
+
+Uso:
+    python -m benchmarks.bench_hot_loops [--seconds 1.0] [--only flatten_raw ...]
+"""
+import argparse
+import datetime
+import random
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from benchmarks._env import configure_env
+
+configure_env()
+
+from app.api.endpoints.energy import (
+    ALL_HISTORICAL_FIELDS,
+    _flatten_aggregated_history,
+    _flatten_raw_history,
+    _generate_mock_alerts,
+)
+from app.api.endpoints.fuel import _create_tanks_from_mongo, _get_center_status
+from app.schemas.energy import DeviceHistoricalData, DeviceSummary
+from benchmarks.fleet import energy_uplinks, fuel_uplinks
+
+FIXTURE_END = datetime.datetime(2025, 10, 20, 12, 0, tzinfo=datetime.timezone.utc)
+DEV_EUI = "e000000001000000"
+FUEL_EUI = "f000000001000000"
+
+
+def _times(days: int, minutes: int) -> list:
+    step = datetime.timedelta(minutes=minutes)
+    return [FIXTURE_END - step * i for i in range(days * 24 * 60 // minutes, 0, -1)]
+
+
+def build_fixtures() -> dict:
+    rng = random.Random(7)
+    raw_docs = [
+        {"time": doc["time"], "object": doc["object"], "deviceInfo": doc["deviceInfo"]}
+        for doc in energy_uplinks(DEV_EUI, _times(1, 5), rng)
+    ]
+    aggregated_docs = []
+    for doc in energy_uplinks(DEV_EUI, _times(30, 30), rng):
+        bucket = {"_id": doc["time"].replace(tzinfo=None)}
+        for field_key, field_path in ALL_HISTORICAL_FIELDS.items():
+            bucket[field_key] = doc["object"][field_path.split(".", 1)[1]]
+        aggregated_docs.append(bucket)
+
+    fuel_doc = next(fuel_uplinks(FUEL_EUI, _times(1, 60), rng))
+    device_pg = SimpleNamespace(dev_eui=FUEL_EUI, name="Estanque bench", center_id=1)
+    tanks = _create_tanks_from_mongo(device_pg, fuel_doc, "1")
+
+    latest = raw_docs[-1]
+    summary_doc = {
+        "_id": {"$oid": "0" * 24},
+        "time": FIXTURE_END.isoformat(),
+        "deviceInfo": {**latest["deviceInfo"], "location": "Centro: 1"},
+        "object": latest["object"],
+        "dailyConsumption": 1234.5,
+        "alerts": _generate_mock_alerts(latest["object"]),
+        "final_energy_counter": latest["object"]["agg_activeEnergy"],
+    }
+    return {
+        "raw_docs": raw_docs,
+        "aggregated_docs": aggregated_docs,
+        "fuel_doc": fuel_doc,
+        "device_pg": device_pg,
+        "tanks": tanks * 20,  # 60 estanques: un centro grande
+        "latest_obj": latest["object"],
+        "summary_doc": summary_doc,
+        # Historial sin validar, tal como sale de _flatten_raw_history
+        "daily_raw": _flatten_raw_history(raw_docs, 1),
+    }
+
+
+def validate_device_summary(fx: dict) -> DeviceSummary:
+    """ Igual que _build_energy_summary: DeviceHistoricalData desde el dict crudo + DeviceSummary """
+    historical_data = {"daily": DeviceHistoricalData(**fx["daily_raw"])}
+    return DeviceSummary.model_validate({**fx["summary_doc"], "historicalData": historical_data})
+
+
+def targets(fx: dict) -> list:
+    """ (nombre, función sin argumentos, puntos procesados por llamada) """
+    fields = len(ALL_HISTORICAL_FIELDS)
+    return [
+        ("flatten_raw_history", lambda: _flatten_raw_history(fx["raw_docs"], 1),
+         len(fx["raw_docs"]) * fields),
+        ("flatten_aggregated_history", lambda: _flatten_aggregated_history(fx["aggregated_docs"], 30),
+         len(fx["aggregated_docs"]) * fields),
+        ("create_tanks_from_mongo", lambda: _create_tanks_from_mongo(fx["device_pg"], fx["fuel_doc"], "1"), 3),
+        ("get_center_status", lambda: _get_center_status(fx["tanks"]), len(fx["tanks"])),
+        ("generate_mock_alerts", lambda: _generate_mock_alerts(fx["latest_obj"]), 1),
+        ("device_summary_validate", lambda: validate_device_summary(fx),
+         len(fx["raw_docs"]) * fields),
+    ]
+
+
+def measure_time(fn, seconds: float) -> tuple:
+    """ Llamadas y tiempo total, corriendo al menos `seconds` """
+    fn()  # calentamiento
+    calls, start = 0, time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        for _ in range(10):
+            fn()
+        calls += 10
+        elapsed = time.perf_counter() - start
+    return calls, elapsed
+
+
+def measure_memory(fn, calls: int = 20) -> tuple:
+    """ (pico KiB por llamada, bloques vivos por llamada) con tracemalloc """
+    tracemalloc.start()
+    try:
+        peaks = []
+        before = tracemalloc.take_snapshot()
+        keep = []
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            keep.append(fn())
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return max(peaks) / 1024, blocks / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="tiempo mínimo por objetivo")
+    parser.add_argument("--only", nargs="*", default=[])
+    args = parser.parse_args()
+
+    fx = build_fixtures()
+    print(f"{'objetivo':<28} {'llamadas/s':>12} {'puntos/s':>14} {'us/llamada':>11} {'pico KiB':>9} {'bloques':>8}")
+    for name, fn, points in targets(fx):
+        if args.only and name not in args.only:
+            continue
+        calls, elapsed = measure_time(fn, args.seconds)
+        peak_kib, blocks = measure_memory(fn)
+        per_second = calls / elapsed
+        print(f"{name:<28} {per_second:12.0f} {per_second * points:14.0f} "
+              f"{elapsed / calls * 1e6:11.1f} {peak_kib:9.1f} {blocks:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
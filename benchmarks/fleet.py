@@ -0,0 +1,306 @@
+# benchmarks/fleet.py
+"""
+Generador de una flota sintética para los benchmarks.
+
+- SQL (SQLite por defecto, o Postgres vía DATABASE_URL): compañías, centros,
+  dispositivos de energía y combustible, y un usuario admin asignado a
+  todas las compañías.
+- Mongo: uplinks con la forma de ChirpStack (deviceInfo, rxInfo, txInfo,
+  object) para cada dispositivo, cada `--interval` minutos durante `--days`
+  días hasta ahora. Los contadores de energía son acumulativos y los
+  estanques se vacían y se rellenan.
+
+Escribe un manifiesto JSON (credenciales, EUIs, parámetros) que leen
+benchmarks.scenarios y benchmarks.loadtest.
+
+Uso:
+    python -m benchmarks.fleet [--companies 2] [--centers 5] [--energy-devices 4]
+        [--fuel-devices 1] [--days 30] [--interval 5] [--manifest bench_fleet.json]
+"""
+import argparse
+import datetime
+import json
+import math
+import random
+import time
+from dataclasses import asdict, dataclass
+
+from benchmarks._env import configure_env
+
+configure_env()
+
+from pymongo import InsertOne, MongoClient
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.database import Base, SessionLocal, engine
+from app.db.mongo_indexes import INDEX_SPECS
+from app.models.association import UserCompany, UserRole
+from app.models.center import Center
+from app.models.company import Company
+from app.models.device import Device, DeviceStatus, DeviceType
+from app.models.user import User
+
+BENCH_USER_EMAIL = "bench@example.com"
+BENCH_USER_PASSWORD = "bench-password"
+DEFAULT_MANIFEST = "bench_fleet.json"
+
+# Centro de Santiago; cada centro se desplaza un poco
+BASE_LATITUDE, BASE_LONGITUDE = -33.45, -70.66
+
+
+@dataclass
+class FleetSpec:
+    companies: int = 2
+    centers_per_company: int = 5
+    energy_devices_per_center: int = 4
+    fuel_devices_per_center: int = 1
+    days: int = 30
+    interval_minutes: int = 5
+    seed: int = 42
+
+    @property
+    def uplinks_per_device(self) -> int:
+        return self.days * 24 * 60 // self.interval_minutes
+
+
+def seed_sql(spec: FleetSpec) -> dict:
+    """ Crea las tablas (si faltan) y carga la flota. Devuelve EUIs por tipo """
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        companies = db.execute(
+            insert(Company).returning(Company.id),
+            [{"name": f"Bench Compañía {i:03d}"} for i in range(spec.companies)]
+        ).scalars().all()
+
+        centers = []
+        for company_id in companies:
+            for j in range(spec.centers_per_company):
+                centers.append({"company_id": company_id, "name": f"Centro {company_id}-{j}", "price_kwh": 250.0})
+        center_ids = db.execute(insert(Center).returning(Center.id), centers).scalars().all()
+
+        euis = {"energia": [], "combustible": []}
+        devices = []
+        for center_id in center_ids:
+            for device_type, count in (
+                (DeviceType.energia, spec.energy_devices_per_center),
+                (DeviceType.combustible, spec.fuel_devices_per_center),
+            ):
+                for k in range(count):
+                    prefix = "e" if device_type == DeviceType.energia else "f"
+                    dev_eui = f"{prefix}{center_id:09x}{k:06x}"
+                    euis[device_type.value].append(dev_eui)
+                    devices.append({
+                        "name": f"{device_type.value.capitalize()} {center_id}-{k}",
+                        "dev_eui": dev_eui,
+                        "status": DeviceStatus.active,
+                        "type": device_type,
+                        "center_id": center_id,
+                    })
+        db.execute(insert(Device), devices)
+
+        user = db.query(User).filter(User.email == BENCH_USER_EMAIL).first()
+        if user is None:
+            user = User(email=BENCH_USER_EMAIL, hashed_password=get_password_hash(BENCH_USER_PASSWORD))
+            db.add(user)
+            db.flush()
+        db.execute(insert(UserCompany), [
+            {"user_id": user.id, "company_id": company_id, "role": UserRole.admin}
+            for company_id in companies
+        ])
+        db.commit()
+    return euis
+
+
+def _rx_info(rng: random.Random, center_offset: float) -> list:
+    return [{
+        "gatewayId": "bench-gw-01",
+        "rssi": rng.randint(-115, -70),
+        "snr": round(rng.uniform(-5, 10), 1),
+        "location": {
+            "latitude": BASE_LATITUDE + center_offset,
+            "longitude": BASE_LONGITUDE - center_offset,
+        },
+    }]
+
+
+def _tx_info() -> dict:
+    return {
+        "frequency": 916800000,
+        "modulation": {"lora": {"bandwidth": 125000, "spreadingFactor": 7, "codeRate": "CR_4_5"}},
+    }
+
+
+def energy_uplinks(dev_eui: str, times: list, rng: random.Random):
+    """ Medidor trifásico: potencia con ciclo diario y contadores acumulativos (Wh) """
+    base_kw = rng.uniform(2, 40)
+    counters = {f"{p}_{kind}": rng.uniform(1e5, 1e6)
+                for p in ("agg", "phaseA", "phaseB", "phaseC")
+                for kind in ("activeEnergy", "reactiveEnergy", "apparentEnergy")}
+    offset = rng.uniform(-0.05, 0.05)
+    hours = (times[1] - times[0]).total_seconds() / 3600 if len(times) > 1 else 0
+    for fcnt, t in enumerate(times):
+        hour = t.hour + t.minute / 60
+        daily = 0.6 + 0.4 * math.sin((hour - 6) / 24 * 2 * math.pi)
+        obj = {"model": 1, "address": 1, "agg_frequency": round(rng.gauss(50, 0.05), 2)}
+        for phase in ("phaseA", "phaseB", "phaseC"):
+            voltage = rng.gauss(220, 2)
+            active = max(base_kw * 1000 / 3 * daily * rng.uniform(0.9, 1.1), 0)
+            pf = rng.uniform(0.85, 0.99)
+            apparent = active / pf
+            reactive = math.sqrt(max(apparent ** 2 - active ** 2, 0))
+            obj.update({
+                f"{phase}_voltage": round(voltage, 1),
+                f"{phase}_current": round(apparent / voltage, 2),
+                f"{phase}_activePower": round(active, 1),
+                f"{phase}_reactivePower": round(reactive, 1),
+                f"{phase}_apparentPower": round(apparent, 1),
+                f"{phase}_powerFactor": round(pf, 3),
+                f"{phase}_thdI": round(rng.uniform(5, 70), 1),
+                f"{phase}_thdU": round(rng.uniform(1, 5), 1),
+            })
+        for kind in ("voltage", "current", "activePower", "reactivePower", "apparentPower", "powerFactor", "thdI"):
+            values = [obj[f"{phase}_{kind}"] for phase in ("phaseA", "phaseB", "phaseC")]
+            total = sum(values)
+            obj[f"agg_{kind}"] = round(total if kind.endswith("Power") or kind == "current" else total / 3, 3)
+
+        for p in ("agg", "phaseA", "phaseB", "phaseC"):
+            counters[f"{p}_activeEnergy"] += obj[f"{p}_activePower"] * hours
+            counters[f"{p}_reactiveEnergy"] += obj[f"{p}_reactivePower"] * hours
+            counters[f"{p}_apparentEnergy"] += obj[f"{p}_apparentPower"] * hours
+        obj.update({key: round(value, 1) for key, value in counters.items()})
+
+        yield {
+            "time": t,
+            "deviceInfo": {
+                "tenantName": "bench",
+                "applicationName": "Energia",
+                "deviceProfileName": "Medidor trifásico",
+                "deviceName": f"Medidor {dev_eui}",
+                "devEui": dev_eui,
+            },
+            "fCnt": fcnt,
+            "fPort": 1,
+            "rxInfo": _rx_info(rng, offset),
+            "txInfo": _tx_info(),
+            "object": obj,
+        }
+
+
+def fuel_uplinks(dev_eui: str, times: list, rng: random.Random):
+    """ Tres estanques que se consumen de a poco y se rellenan bajo el 15% """
+    capacities = (10000, 15000, 8000)
+    levels = [rng.uniform(0.3, 1.0) for _ in capacities]
+    rates = [rng.uniform(0.0005, 0.003) for _ in capacities]
+    offset = rng.uniform(-0.05, 0.05)
+    for fcnt, t in enumerate(times):
+        obj = {"battery": round(rng.uniform(3.3, 3.7), 2), "temperature": round(rng.gauss(16, 4), 1)}
+        for i, capacity in enumerate(capacities):
+            levels[i] -= rates[i] * rng.uniform(0.5, 1.5)
+            if levels[i] < 0.15:
+                levels[i] = rng.uniform(0.85, 1.0)
+            obj.update({
+                f"volume_L_S{i}": round(levels[i] * capacity, 1),
+                f"percentage_S{i}": round(levels[i] * 100, 1),
+                f"pressure_Bar_S{i}": round(levels[i] * 1.5 + rng.gauss(0, 0.02), 3),
+                f"sensor_{i}_ok": rng.random() > 0.01,
+            })
+        yield {
+            "time": t,
+            "deviceInfo": {
+                "tenantName": "bench",
+                "applicationName": "Combustible",
+                "deviceProfileName": "Sensor de estanques",
+                "deviceName": f"Estanque {dev_eui}",
+                "devEui": dev_eui,
+            },
+            "fCnt": fcnt,
+            "fPort": 2,
+            "rxInfo": _rx_info(rng, offset),
+            "txInfo": _tx_info(),
+            "object": obj,
+        }
+
+
+def seed_mongo(spec: FleetSpec, euis: dict, drop: bool, batch_size: int = 5000) -> int:
+    client = MongoClient(settings.MONGO_URL)
+    collections = {
+        "energy": client[settings.MONGO_DB_NAME][settings.MONGO_COLLECTION_NAME],
+        "fuel": client[settings.MONGO_FUEL_DB_NAME][settings.MONGO_COLLECTION_NAME2],
+    }
+    if drop:
+        for collection in collections.values():
+            collection.drop()
+    for key, keys, options in INDEX_SPECS:
+        collections[key].create_index(keys, **options)
+
+    end = datetime.datetime.now(datetime.timezone.utc).replace(second=0, microsecond=0)
+    step = datetime.timedelta(minutes=spec.interval_minutes)
+    times = [end - step * i for i in range(spec.uplinks_per_device, 0, -1)]
+    rng = random.Random(spec.seed)
+
+    inserted = 0
+    for key, generator, device_euis in (
+        ("energy", energy_uplinks, euis["energia"]),
+        ("fuel", fuel_uplinks, euis["combustible"]),
+    ):
+        batch = []
+        for dev_eui in device_euis:
+            for doc in generator(dev_eui, times, rng):
+                batch.append(InsertOne(doc))
+                if len(batch) >= batch_size:
+                    collections[key].bulk_write(batch, ordered=False)
+                    inserted += len(batch)
+                    batch = []
+        if batch:
+            collections[key].bulk_write(batch, ordered=False)
+            inserted += len(batch)
+    client.close()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=FleetSpec.companies)
+    parser.add_argument("--centers", type=int, default=FleetSpec.centers_per_company, help="centros por compañía")
+    parser.add_argument("--energy-devices", type=int, default=FleetSpec.energy_devices_per_center, help="por centro")
+    parser.add_argument("--fuel-devices", type=int, default=FleetSpec.fuel_devices_per_center, help="por centro")
+    parser.add_argument("--days", type=int, default=FleetSpec.days)
+    parser.add_argument("--interval", type=int, default=FleetSpec.interval_minutes, help="minutos entre uplinks")
+    parser.add_argument("--seed", type=int, default=FleetSpec.seed)
+    parser.add_argument("--keep-mongo", action="store_true", help="no borrar las colecciones antes de cargar")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    args = parser.parse_args()
+
+    spec = FleetSpec(
+        companies=args.companies,
+        centers_per_company=args.centers,
+        energy_devices_per_center=args.energy_devices,
+        fuel_devices_per_center=args.fuel_devices,
+        days=args.days,
+        interval_minutes=args.interval,
+        seed=args.seed,
+    )
+
+    start = time.perf_counter()
+    euis = seed_sql(spec)
+    print(f"SQL: {len(euis['energia'])} medidores, {len(euis['combustible'])} sensores de combustible")
+    inserted = seed_mongo(spec, euis, drop=not args.keep_mongo)
+    print(f"Mongo: {inserted} uplinks ({spec.uplinks_per_device} por dispositivo) "
+          f"en {time.perf_counter() - start:.1f} s")
+
+    manifest = {
+        "spec": asdict(spec),
+        "user": {"email": BENCH_USER_EMAIL, "password": BENCH_USER_PASSWORD},
+        "euis": euis,
+        "database_url": settings.DATABASE_URL,
+        "mongo_url": settings.MONGO_URL,
+    }
+    with open(args.manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Manifiesto: {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# benchmarks/loadtest.py
+"""
+Generador de carga: sesiones de dashboard concurrentes y autenticadas.
+
+Cada sesión inicia sesión (POST /api/token) y luego, hasta que se acaba el
+tiempo, repite el ciclo del frontend: /api/energy/summary,
+/api/fuel/summary y la página de detalles de un medidor al azar, con una
+pausa (`--think`) entre requests.
+
+Corre la app en el mismo proceso (httpx + ASGITransport) o contra una
+instancia local de uvicorn con --base-url. Usa el manifiesto de
+benchmarks.fleet (credenciales y EUIs).
+
+Reporta p50/p95/p99 por endpoint y throughput total. Con --slo
+(endpoint=p95_ms, o "all") y --max-error-rate, termina con código 1 si algún
+objetivo no se cumple.
+
+Uso:
+    python -m benchmarks.loadtest [--sessions 20] [--duration 30] [--think 0.5]
+        [--base-url http://127.0.0.1:8000] [--slo energy_summary=800 --slo all=1500]
+        [--max-error-rate 0.01] [--output loadtest.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks._env import configure_env
+
+configure_env()
+
+import httpx
+
+from benchmarks._report import git_commit, percentile
+
+LOGIN_RETRIES = 10
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, name: str, elapsed_ms: float, ok: bool) -> None:
+        self.latencies[name].append(elapsed_ms)
+        if not ok:
+            self.errors[name] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        all_latencies = []
+        for name, values in sorted(self.latencies.items()):
+            all_latencies.extend(values)
+            endpoints[name] = _stats(values, self.errors[name])
+        endpoints["all"] = _stats(all_latencies, sum(self.errors.values()))
+        return {
+            "duration_s": round(elapsed, 2),
+            "throughput_rps": round(len(all_latencies) / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def _stats(values: list, errors: int) -> dict:
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+    }
+
+
+async def _timed(client: httpx.AsyncClient, recorder: Recorder, name: str, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        response, ok = None, False
+    recorder.add(name, (time.perf_counter() - start) * 1000, ok)
+    return response
+
+
+async def _login(client: httpx.AsyncClient, recorder: Recorder, manifest: dict) -> dict:
+    credentials = {"username": manifest["user"]["email"], "password": manifest["user"]["password"]}
+    for _ in range(LOGIN_RETRIES):
+        response = await _timed(client, recorder, "login", "POST", "/api/token", data=credentials)
+        if response is not None and response.status_code == 503:
+            # Pool de bcrypt saturado: respetar Retry-After
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+            continue
+        if response is None or response.status_code != 200:
+            break
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    raise RuntimeError("La sesión no pudo iniciar sesión")
+
+
+async def session(client: httpx.AsyncClient, recorder: Recorder, manifest: dict,
+                  deadline: float, think: float, rng: random.Random) -> None:
+    headers = await _login(client, recorder, manifest)
+    energy_euis = manifest["euis"]["energia"]
+    requests = [
+        ("energy_summary", "/api/energy/summary", {"time_range": "1d"}),
+        ("fuel_summary", "/api/fuel/summary", {}),
+        ("energy_details", None, {"days": 30}),
+    ]
+    while time.perf_counter() < deadline:
+        for name, path, params in requests:
+            if path is None:
+                path = f"/api/energy/details/{rng.choice(energy_euis)}"
+            await _timed(client, recorder, name, "GET", path, params=params, headers=headers)
+            if time.perf_counter() >= deadline:
+                return
+            await asyncio.sleep(think * rng.uniform(0.5, 1.5))
+
+
+async def run(manifest: dict, args) -> dict:
+    recorder = Recorder()
+    in_process = args.base_url is None
+    if in_process:
+        from app.db.mongodb import close_mongo_connection, connect_to_mongo
+        from app.main import app
+
+        await connect_to_mongo()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=None)
+    else:
+        limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits)
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    deadline = start + args.duration
+    try:
+        async with client:
+            # Arranque escalonado para no iniciar todas las sesiones en el mismo instante
+            tasks = []
+            for i in range(args.sessions):
+                tasks.append(asyncio.create_task(session(
+                    client, recorder, manifest, deadline, args.think, random.Random(rng.random())
+                )))
+                await asyncio.sleep(args.ramp_up / args.sessions if args.sessions else 0)
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if in_process:
+            await close_mongo_connection()
+
+    failed_sessions = sum(1 for outcome in outcomes if isinstance(outcome, Exception))
+    result = recorder.summary(time.perf_counter() - start)
+    result["failed_sessions"] = failed_sessions
+    return result
+
+
+def parse_slos(values: list) -> dict:
+    slos = {}
+    for value in values:
+        name, _, limit = value.partition("=")
+        if not limit:
+            raise SystemExit(f"SLO inválido: {value!r} (formato endpoint=p95_ms)")
+        slos[name] = float(limit)
+    return slos
+
+
+def check_slos(result: dict, slos: dict, max_error_rate: float) -> list:
+    violations = []
+    for name, limit in slos.items():
+        stats = result["endpoints"].get(name)
+        if stats is None:
+            violations.append(f"{name}: sin requests")
+        elif stats["p95_ms"] > limit:
+            violations.append(f"{name}: p95 {stats['p95_ms']:.1f} ms > {limit:.1f} ms")
+    if max_error_rate is not None:
+        for name, stats in result["endpoints"].items():
+            if stats["error_rate"] > max_error_rate:
+                violations.append(f"{name}: tasa de error {stats['error_rate']:.2%} > {max_error_rate:.2%}")
+    if result["failed_sessions"]:
+        violations.append(f"{result['failed_sessions']} sesiones fallaron")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default="bench_fleet.json")
+    parser.add_argument("--base-url", default=None, help="instancia de uvicorn; por defecto, en proceso")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="segundos para abrir todas las sesiones")
+    parser.add_argument("--think", type=float, default=0.5, help="pausa media entre requests (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--slo", action="append", default=[], help="endpoint=p95_ms (repetible; 'all' = global)")
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    parser.add_argument("--output", default=None, help="archivo JSON de resultados")
+    args = parser.parse_args()
+
+    slos = parse_slos(args.slo)
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    result = asyncio.run(run(manifest, args))
+
+    print(f"{'endpoint':<16} {'requests':>9} {'errores':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in result["endpoints"].items():
+        print(f"{name:<16} {stats['requests']:9d} {stats['errors']:8d} "
+              f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f}")
+    print(f"throughput: {result['throughput_rps']:.1f} req/s en {result['duration_s']:.1f} s "
+          f"({args.sessions} sesiones)")
+
+    violations = check_slos(result, slos, args.max_error_rate)
+    if args.output:
+        report = {
+            "git": git_commit(),
+            "target": args.base_url or "in-process",
+            "sessions": args.sessions,
+            "slos": slos,
+            "violations": violations,
+            **result,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if violations:
+        print("SLO no cumplidos:")
+        for violation in violations:
+            print(f"  - {violation}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/scenarios.py
+"""
+Escenarios de benchmark sobre la flota de benchmarks.fleet.
+
+Corre la app en el mismo proceso (httpx + ASGITransport, sin red) contra las
+bases configuradas (las mismas que usó el generador) y mide cada escenario
+`--repeat` veces:
+
+- energy_summary[<time_range>] para cada rango (5m ... 30d)
+- energy_details
+- fuel_summary
+- device_history (1 día y `days` días)
+
+Los resultados (mediana, p95, mín/máx, tamaño de respuesta y el último
+Server-Timing) se escriben en JSON junto con el commit de git, para
+compararlos entre commits:
+
+    python -m benchmarks.scenarios [--manifest bench_fleet.json] [--repeat 5] [--output results.json]
+    python -m benchmarks.scenarios --compare antes.json despues.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks._env import configure_env
+
+configure_env()
+
+import httpx
+
+from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.main import app
+from benchmarks._report import git_commit, percentile
+
+ENERGY_TIME_RANGES = ("5m", "30m", "1h", "6h", "12h", "1d", "7d", "14d", "30d")
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> dict:
+    response = await client.post("/api/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def scenarios(manifest: dict) -> list:
+    """ (nombre, path, params) de cada escenario """
+    energy_eui = manifest["euis"]["energia"][0]
+    days = manifest["spec"]["days"]
+    end = datetime.datetime.now(datetime.timezone.utc)
+    items = [
+        (f"energy_summary[{time_range}]", "/api/energy/summary", {"time_range": time_range})
+        for time_range in ENERGY_TIME_RANGES
+    ]
+    items.append(("energy_details", f"/api/energy/details/{energy_eui}", {"days": min(days, 30)}))
+    items.append(("fuel_summary", "/api/fuel/summary", {}))
+    for label, span in (("1d", 1), (f"{days}d", days)):
+        items.append((f"device_history[{label}]", f"/api/devices/{energy_eui}/history", {
+            "start_date": (end - datetime.timedelta(days=span)).isoformat(),
+            "end_date": end.isoformat(),
+        }))
+    return items
+
+
+async def run(manifest: dict, repeat: int, only: list) -> dict:
+    await connect_to_mongo()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            headers = await login(client, manifest["user"]["email"], manifest["user"]["password"])
+            for name, path, params in scenarios(manifest):
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                timings, size, server_timing = [], 0, None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = await client.get(path, params=params, headers=headers)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+                    size = len(response.content)
+                    server_timing = response.headers.get("server-timing")
+                results[name] = {
+                    "median_ms": round(statistics.median(timings), 2),
+                    "p95_ms": round(percentile(timings, 95), 2),
+                    "min_ms": round(min(timings), 2),
+                    "max_ms": round(max(timings), 2),
+                    "response_bytes": size,
+                    "server_timing": server_timing,
+                }
+                print(f"{name:<28} mediana {results[name]['median_ms']:9.1f} ms  "
+                      f"p95 {results[name]['p95_ms']:9.1f} ms  {size:>10} B")
+    finally:
+        await close_mongo_connection()
+    return results
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+    print(f"antes:   {before['git']['commit']}\ndespués: {after['git']['commit']}")
+    for name, result in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None:
+            print(f"{name:<28} (nuevo) {result['median_ms']:9.1f} ms")
+            continue
+        change = (result["median_ms"] - old["median_ms"]) / old["median_ms"] * 100 if old["median_ms"] else 0.0
+        print(f"{name:<28} {old['median_ms']:9.1f} -> {result['median_ms']:9.1f} ms  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default="bench_fleet.json")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", default=[], help="prefijos de escenario a correr")
+    parser.add_argument("--output", default=None, help="archivo JSON de resultados")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    results = asyncio.run(run(manifest, args.repeat, args.only))
+    report = {
+        "git": git_commit(),
+        "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "fleet": manifest["spec"],
+        "scenarios": results,
+    }
+    output = args.output or f"bench_results_{(report['git']['commit'] or 'nogit')[:10]}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from logging.config import fileConfig
 from app.db.database import Base
-from app.models import user, company, device, association
+from app.models import user, company, center, device, association
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
@@ -0,0 +1,102 @@
+"""Centros, tipo de dispositivo e indices para las rutas de energia y combustible
+
+Revision ID: 3b7d2c91e4a5
+Revises: fcbbcda4fa12
+Create Date: 2025-11-03 09:12:41.518204
+
+Alinea el esquema con los modelos (tabla centers con price_kwh,
+devices.center_id y devices.type en lugar de devices.company_id) y agrega los
+indices que usan los filtros calientes:
+
+- ix_devices_center_id_type: Device(center_id, type) -> summary de energia y
+  combustible (join con centers + filtro por tipo).
+- ix_centers_company_id: Center.company_id -> filtro por compañías del usuario.
+- ix_user_company_company_id: UserCompany(company_id). UserCompany.user_id ya
+  esta cubierto por la PK (user_id, company_id), que empieza por user_id.
+
+Estos indices no sirven el keyset de /devices/details (orden compañía,
+centro, nombre, id sobre un join de tres tablas): cada página sigue haciendo
+el join y el sort de toda la flota (ver get_devices_with_details). Queda
+pendiente (TODO) decidir entre una clave de orden desnormalizada en devices o
+paginar por Device.id.
+
+Los dispositivos existentes (que colgaban de una compañía) quedan en un
+centro "Centro principal" por compañía y con type = 'energia'.
+
+Si la base se creo con app/scripts/reset_db.py (create_all) ya tiene tablas y
+columnas: en ese caso basta con crear los indices o hacer `alembic stamp head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d2c91e4a5'
+down_revision: Union[str, Sequence[str], None] = 'fcbbcda4fa12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+devicetype = sa.Enum('energia', 'combustible', name='devicetype')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('centers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=True),
+    sa.Column('price_kwh', sa.Float(), server_default='250.0', nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_centers_id'), 'centers', ['id'], unique=False)
+    op.create_index(op.f('ix_centers_name'), 'centers', ['name'], unique=False)
+    op.create_index(op.f('ix_centers_company_id'), 'centers', ['company_id'], unique=False)
+
+    # devices: company_id -> center_id, y nueva columna type
+    devicetype.create(op.get_bind(), checkfirst=True)
+    op.add_column('devices', sa.Column('center_id', sa.Integer(), nullable=True))
+    op.add_column('devices', sa.Column('type', devicetype, server_default='energia', nullable=False))
+    op.alter_column('devices', 'type', server_default=None)
+    op.create_foreign_key('devices_center_id_fkey', 'devices', 'centers', ['center_id'], ['id'])
+
+    op.execute(
+        "INSERT INTO centers (name, company_id) "
+        "SELECT DISTINCT 'Centro principal', company_id FROM devices WHERE company_id IS NOT NULL"
+    )
+    op.execute(
+        "UPDATE devices SET center_id = centers.id FROM centers "
+        "WHERE centers.company_id = devices.company_id AND centers.name = 'Centro principal'"
+    )
+
+    op.drop_constraint('devices_company_id_fkey', 'devices', type_='foreignkey')
+    op.drop_column('devices', 'company_id')
+
+    op.create_index('ix_devices_center_id_type', 'devices', ['center_id', 'type'], unique=False)
+    op.create_index('ix_user_company_company_id', 'user_company', ['company_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_company_company_id', table_name='user_company')
+    op.drop_index('ix_devices_center_id_type', table_name='devices')
+
+    op.add_column('devices', sa.Column('company_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('devices_company_id_fkey', 'devices', 'companies', ['company_id'], ['id'])
+    op.execute(
+        "UPDATE devices SET company_id = centers.company_id FROM centers "
+        "WHERE centers.id = devices.center_id"
+    )
+
+    op.drop_constraint('devices_center_id_fkey', 'devices', type_='foreignkey')
+    op.drop_column('devices', 'type')
+    op.drop_column('devices', 'center_id')
+    devicetype.drop(op.get_bind(), checkfirst=True)
+
+    op.drop_index(op.f('ix_centers_company_id'), table_name='centers')
+    op.drop_index(op.f('ix_centers_name'), table_name='centers')
+    op.drop_index(op.f('ix_centers_id'), table_name='centers')
+    op.drop_table('centers')
@@ -0,0 +1,21 @@
+# tests/conftest.py
+"""
+Variables que exige app.core.config.Settings, para importar `app` sin un
+.env real. Se fijan antes de que los tests importen cualquier módulo de app.
+"""
+import os
+
+_DEFAULTS = {
+    "DATABASE_URL": "sqlite:///./test.db",
+    "MONGO_URL": "mongodb://localhost:27017",
+    "MONGO_DB_NAME": "test_energia",
+    "MONGO_COLLECTION_NAME": "uplinks",
+    "MONGO_FUEL_DB_NAME": "test_combustible",
+    "MONGO_COLLECTION_NAME2": "uplinks",
+    "SECRET_KEY": "test-secret-key",
+    # Costo bajo para que los tests de bcrypt sean rápidos
+    "BCRYPT_ROUNDS": "5",
+}
+
+for _key, _value in _DEFAULTS.items():
+    os.environ.setdefault(_key, _value)
@@ -0,0 +1,94 @@
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+from app.core.live_stream import LiveHub, Subscription
+
+
+class FakeStream:
+    """ Change stream con una lista de (change, resume_token); `error` se lanza al agotarla """
+
+    def __init__(self, batches, error=None):
+        self._batches = list(batches)
+        self._error = error
+        self.resume_token = None
+        self.alive = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def try_next(self):
+        if not self._batches:
+            if self._error is not None:
+                raise self._error
+            self.alive = False
+            return None
+        change, self.resume_token = self._batches.pop(0)
+        return change
+
+
+class FakeCollection:
+    full_name = "test.uplinks"
+
+    def __init__(self, streams):
+        self._streams = list(streams)
+        self.resume_after = []
+
+    def watch(self, pipeline, resume_after=None):
+        self.resume_after.append(resume_after)
+        stream = self._streams.pop(0)
+        if isinstance(stream, Exception):
+            raise stream
+        return stream
+
+
+def _insert(eui: str, value: float) -> dict:
+    return {"fullDocument": {"deviceInfo": {"devEui": eui}, "time": None, "object": {"power": value}}}
+
+
+def _subscribe(hub: LiveHub, device_types: dict) -> Subscription:
+    sub = Subscription(device_types)
+    for eui in sub.dev_euis:
+        hub._by_eui.setdefault(eui, set()).add(sub)
+    return sub
+
+
+def test_stream_resumes_after_last_token():
+    hub = LiveHub()
+    collection = FakeCollection([
+        FakeStream([(_insert("e1", 1.0), "t1"), (None, "t2")], error=ConnectionError("corte")),
+        FakeStream([(_insert("e1", 2.0), "t3")]),
+    ])
+
+    async def scenario():
+        try:
+            await hub._follow("energia", collection)
+        except ConnectionError:
+            pass
+        await hub._follow("energia", collection)
+
+    asyncio.run(scenario())
+
+    # El token avanza aunque el batch no traiga inserts
+    assert collection.resume_after == [None, "t2"]
+    assert hub._latest["e1"]["object"] == {"power": 2.0}
+
+
+def test_failed_resume_sends_resync_to_subscribers_of_that_type():
+    hub = LiveHub()
+    hub._resume_tokens["energia"] = "expirado"
+    energy_sub = _subscribe(hub, {"e1": "energia"})
+    fuel_sub = _subscribe(hub, {"f1": "combustible"})
+    collection = FakeCollection([
+        OperationFailure("resume token not found", code=286),
+        FakeStream([]),
+    ])
+
+    asyncio.run(hub._follow("energia", collection))
+
+    assert collection.resume_after == ["expirado", None]
+    assert "event: resync" in energy_sub.queue.get_nowait()
+    assert fuel_sub.queue.empty()
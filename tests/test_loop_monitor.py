@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from app.core.loop_monitor import LOOP_LAG, LoopMonitor
+
+
+def _slow_lag_observations() -> int:
+    """ Observaciones del histograma por encima de 0.25 s """
+    state = LOOP_LAG._values.get((), [0] * (len(LOOP_LAG.buckets) + 2))
+    return sum(count for upper, count in zip(LOOP_LAG.buckets, state) if upper > 0.25)
+
+
+def _blocking_call():
+    time.sleep(0.4)
+
+
+def test_blocked_loop_is_measured_and_stack_captured():
+    monitor = LoopMonitor(interval_ms=20, block_threshold_ms=100)
+    before = _slow_lag_observations()
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        _blocking_call()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert _slow_lag_observations() > before
+    assert len(monitor.blocks) == 1
+    block = monitor.blocks[0]
+    assert "_blocking_call" in block["stack"]
+    assert block["blocked_ms"] >= 300
+
+
+def test_no_block_recorded_without_blocking():
+    monitor = LoopMonitor(interval_ms=20, block_threshold_ms=100)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.2)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert not monitor.blocks
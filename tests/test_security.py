@@ -0,0 +1,40 @@
+import asyncio
+
+from passlib.hash import bcrypt
+
+from app.core import security
+from app.core.config import settings
+
+
+def _verify(password: str, hashed: str):
+    return asyncio.run(security.verify_and_update_password(password, hashed))
+
+
+def test_old_cost_hash_is_rehashed_on_login():
+    old_hash = bcrypt.using(rounds=4).hash("secreto")
+
+    verified, new_hash = _verify("secreto", old_hash)
+
+    assert verified
+    assert new_hash is not None and new_hash != old_hash
+    assert bcrypt.from_string(new_hash).rounds == settings.BCRYPT_ROUNDS
+    assert _verify("secreto", new_hash) == (True, None)
+
+
+def test_higher_cost_hash_is_rehashed_too():
+    verified, new_hash = _verify("secreto", bcrypt.using(rounds=settings.BCRYPT_ROUNDS + 1).hash("secreto"))
+
+    assert verified
+    assert bcrypt.from_string(new_hash).rounds == settings.BCRYPT_ROUNDS
+
+
+def test_current_cost_hash_is_kept():
+    current_hash = security.get_password_hash("secreto")
+
+    assert _verify("secreto", current_hash) == (True, None)
+
+
+def test_wrong_password_does_not_rehash():
+    old_hash = bcrypt.using(rounds=4).hash("secreto")
+
+    assert _verify("otra", old_hash) == (False, None)